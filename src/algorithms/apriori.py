@@ -1,5 +1,14 @@
-import numpy as np
+import heapq
 from itertools import combinations
+from math import comb
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from algorithms.bitmap import encode_bitmap, count_candidates
+from algorithms.limits import Limits, MiningResult
+from preprocessing.store import TransactionStore
 
 def get_support(itemset, tx_list):
     """Compute support for a given itemset over a list of transactions (sets)."""
@@ -10,96 +19,538 @@ def get_support(itemset, tx_list):
             count += 1
     return count / len(tx_list) if tx_list else 0.0
 
-def apriori(transactions, min_support=0.2):
+def apriori_gen(prev, stop=None, limit=None):
     """
-    Return dict: {k: {frozenset(items): support}} for each size k>=1.
-    transactions: list of sets
+    Build size-k candidates from the sorted list of frequent (k-1)-itemsets
+    (sorted tuples). Only itemsets sharing the same (k-2)-prefix are joined,
+    and a candidate is kept only if all of its (k-1)-subsets are frequent.
+    stop: optional function polled before each itemset's joins; generation
+    is abandoned (None is returned) as soon as it returns a true value.
+    limit: stop after this many candidates.
+    Returns a sorted list of tuples.
     """
-    item_counts = {}
-    n_tx = len(transactions)
+    prev_set = set(prev)
+    cand = []
+    i = 0
+    n = len(prev)
+    while i < n:
+        # prev is sorted, so itemsets with the same prefix are contiguous
+        prefix = prev[i][:-1]
+        j = i
+        while j < n and prev[j][:-1] == prefix:
+            j += 1
+        for a in range(i, j):
+            if stop is not None and stop():
+                return None
+            for b in range(a + 1, j):
+                c = prev[a] + (prev[b][-1],)
+                # prune: the two subsets dropping either of the last two
+                # items are prev[a] and prev[b] themselves
+                if all(c[:x] + c[x + 1:] in prev_set for x in range(len(c) - 2)):
+                    cand.append(c)
+                    if limit is not None and len(cand) >= limit:
+                        return cand
+        i = j
+    return cand
+
+def _join_consequents(passed, items):
+    """
+    Next-size consequents for one itemset (its sorted items) from the ones
+    (sorted tuples) that passed min_conf. A prefix join like apriori_gen(),
+    without its subset check: a consequent with a failing subset fails
+    min_conf itself, which costs one lookup instead of one per subset.
+    """
+    m = len(passed[0])
+    if len(passed) == comb(len(items), m):
+        # nothing failed, so every consequent of the next size is a candidate
+        return list(combinations(items, m + 1))
+    groups = {}
+    for B in passed:
+        groups.setdefault(B[:-1], []).append(B[-1])
+    return [prefix + (a, b)
+            for prefix, last in groups.items()
+            for i, a in enumerate(last) for b in last[i + 1:]]
+
+# transactions counted between two polls of a count_with_trie() stop function
+STOP_POLL = 1024
+
+def _join_count(prev):
+    """Number of prefix joins apriori_gen(prev) tries before subset pruning."""
+    sizes = {}
+    for c in prev:
+        sizes[c[:-1]] = sizes.get(c[:-1], 0) + 1
+    return sum(g * (g - 1) // 2 for g in sizes.values())
+
+def count_with_trie(candidates, tx_sorted, stop=None):
+    """
+    Count all size-k candidates (sorted tuples) in a single pass over the
+    transactions (sorted tuples) using a prefix trie of nested dicts.
+    stop: optional function polled every STOP_POLL transactions; counting
+    is abandoned (None is returned) as soon as it returns a true value.
+    Returns a list of counts aligned with candidates.
+    """
+    k = len(candidates[0])
+    root = {}
+    counts = [0] * len(candidates)
+    for idx, c in enumerate(candidates):
+        node = root
+        for it in c[:-1]:
+            node = node.setdefault(it, {})
+        node[c[-1]] = idx
+
+    for n, t in enumerate(tx_sorted):
+        if stop is not None and n % STOP_POLL == 0 and stop():
+            return None
+        if len(t) < k:
+            continue
+        # (trie node, depth, next position in t)
+        stack = [(root, 0, 0)]
+        while stack:
+            node, depth, pos = stack.pop()
+            # leave room for the remaining k - depth - 1 items
+            last = len(t) - (k - depth - 1)
+            for p in range(pos, last):
+                child = node.get(t[p])
+                if child is None:
+                    continue
+                if depth == k - 1:
+                    counts[child] += 1
+                else:
+                    stack.append((child, depth + 1, p + 1))
+    return counts
+
+def count_items(transactions):
+    """{item: number of transactions containing it} of a list of item collections or a TransactionStore."""
+    if isinstance(transactions, TransactionStore):
+        return {i: c for i, c in enumerate(transactions.item_counts().tolist()) if c}
+    counts = {}
     for t in transactions:
         for it in set(t):
-            item_counts[it] = item_counts.get(it, 0) + 1
+            counts[it] = counts.get(it, 0) + 1
+    return counts
+
+def count_itemsets(transactions, itemsets):
+    """
+    Exact counts of sorted item tuples (any mix of sizes) in a list of item
+    collections or a TransactionStore, as a dict. Single items come from
+    count_items(), larger itemsets from one count_with_trie() pass per size.
+    """
+    by_k = {}
+    for c in itemsets:
+        by_k.setdefault(len(c), []).append(c)
+    item_counts = count_items(transactions)
+    counts = {c: item_counts.get(c[0], 0) for c in by_k.pop(1, [])}
+    if by_k:
+        if isinstance(transactions, TransactionStore):
+            transactions = transactions.rows()
+        # items that appear in no candidate can't affect any count
+        items = {it for cands in by_k.values() for c in cands for it in c}
+        tx_sorted = [tuple(sorted(items.intersection(t))) for t in transactions]
+        for cands in by_k.values():
+            counts.update(zip(cands, count_with_trie(cands, tx_sorted)))
+    return counts
+
+def apriori(transactions, min_support=0.2, backend="python", batch_size=256, decode=True,
+            stats=None, max_len=None, max_candidates=None, time_budget=None,
+            memory_budget=None):
+    """
+    Return dict: {k: {frozenset(items): support}} for each size k>=1
+    (a MiningResult, see below).
+    transactions: list of sets, or a TransactionStore (mined on integer ids;
+    decode=False keeps the ids in the output instead of product names)
+    backend: "python" counts each level's candidates in one pass with a prefix
+    trie, "bitmap" encodes the transactions once as a packed bit matrix and
+    counts candidates in batches.
+    stats: optional MiningStats, one row per level.
+    max_len, max_candidates, time_budget, memory_budget: optional limits
+    (see limits.Limits), checked while each level is generated and counted,
+    so a level is never built past max_candidates. A run that hits one
+    stops there and returns the complete levels so far with truncated=True,
+    the reason and level_reached set on the result.
+    """
+    if backend not in ("python", "bitmap"):
+        raise ValueError(f"Unknown apriori backend: {backend!r}")
+    limits = Limits(max_len, max_candidates, time_budget, memory_budget)
+    reason = None
+    if stats is not None:
+        stats.start("apriori", 1)
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    item_counts = count_items(transactions)
+    n_tx = len(transactions)
 
     L = {}
     L1 = {frozenset([it]): c / n_tx
           for it, c in item_counts.items()
           if c / n_tx >= min_support}
     if not L1:
-        return {}
+        if stats is not None:
+            stats.stop(candidates=len(item_counts))
+        return MiningResult()
 
     L[1] = L1
+    if backend == "bitmap" and store is not None:
+        index = {i: i for i in range(store.n_items)}
+        bits = store.to_bitmap()
+    elif backend == "bitmap":
+        _, index, bits = encode_bitmap(transactions)
+    else:
+        # only frequent items can be part of a candidate; keep each
+        # transaction as a sorted tuple of those for the trie walk
+        # (a store is only turned back into rows here, the bitmap needs none)
+        frequent_items = {it for it, c in item_counts.items() if c / n_tx >= min_support}
+        rows = store.rows() if store is not None else transactions
+        tx_sorted = [tuple(sorted(frequent_items.intersection(t))) for t in rows]
+    if stats is not None:
+        stats.stop(candidates=len(item_counts), frequent=len(L1))
     k = 2
-    current_L = L1
-
-    while current_L:
-        # generate candidates by self-join
-        cand = set()
-        keys = list(current_L.keys())
-        for i in range(len(keys)):
-            for j in range(i + 1, len(keys)):
-                union = keys[i] | keys[j]
-                if len(union) == k:
-                    # prune: all (k-1)-subsets must be frequent
-                    all_subfreq = all(
-                        (union - frozenset([x])) in current_L
-                        for x in union
-                    )
-                    if all_subfreq:
-                        cand.add(union)
+    current = sorted(tuple(sorted(s)) for s in L1)
+
+    def stop():
+        # polled while counting: cancel() or a spent budget abandons the level
+        if stats is not None and stats.cancelled:
+            return True
+        return limits.bounded and limits.exceeded() is not None
+
+    if stats is None and not limits.bounded:
+        stop = None
+    while current:
+        if max_len is not None and k > max_len:
+            # truncated only if there was a next level to cut off
+            if apriori_gen(current, limit=1):
+                reason = "max_len"
+            break
+        if stats is not None:
+            stats.start("apriori", k)
+            joined = _join_count(current)
+        # don't even generate the next level once the budget is spent
+        reason = limits.exceeded() if limits.bounded else None
+        if reason is not None:
+            if stats is not None:
+                stats.stop(candidates=joined)
+            break
+        # one candidate over the cap is enough to know it's exceeded
+        cap = None
+        if limits.max_candidates is not None:
+            cap = limits.max_candidates - limits.candidates + 1
+        cand = apriori_gen(current, stop=stop, limit=cap)
+        if cand is None:
+            if stats is not None:
+                stats.check()
+            # a budget ran out while generating this level
+            reason = limits.reason
+            if stats is not None:
+                stats.stop(candidates=joined)
+            break
+        if not cand:
+            if stats is not None:
+                stats.stop(candidates=joined, pruned=joined)
+            break
+        reason = limits.exceeded(len(cand))
+        if reason is not None:
+            if stats is not None:
+                stats.stop(candidates=joined, pruned=joined - len(cand))
+            break
 
         # count support
+        if backend == "bitmap":
+            counts = count_candidates(cand, index, bits, batch_size=batch_size, stop=stop)
+        else:
+            counts = count_with_trie(cand, tx_sorted, stop=stop)
+        if counts is None:
+            if stats is not None:
+                stats.check()
+            # a budget ran out while counting this level
+            reason = limits.reason
+            if stats is not None:
+                stats.stop(candidates=joined, pruned=joined - len(cand))
+            break
+
         Ck = {}
-        for c in cand:
-            sup = get_support(c, transactions)
+        current = []
+        for c, cnt in zip(cand, counts):
+            sup = cnt / n_tx
             if sup >= min_support:
-                Ck[c] = sup
+                Ck[frozenset(c)] = sup
+                current.append(c)
+        if stats is not None:
+            stats.stop(candidates=joined, pruned=joined - len(cand), frequent=len(Ck))
 
         if Ck:
             L[k] = Ck
-            current_L = Ck
             k += 1
-        else:
-            break
 
-    return L
+    if store is not None and decode:
+        L = store.decode_itemsets(L)
+    return MiningResult(L, truncated=reason is not None, reason=reason)
 
-def generate_rules(freq_dict, min_conf=0.5, n_tx=1):
+def rule_table(freq_dict, min_conf=0.5, names=None, top_k=None, stats=None):
+    """
+    Columnar variant of generate_rules(): returns a DataFrame with one row per
+    rule, sorted by confidence then lift. Every frequent itemset gets an id
+    (df.attrs['itemsets'][id] is the itemset); rules are enumerated as
+    antecedent_id/consequent_id/itemset_id arrays and all metrics (support,
+    confidence, lift, leverage, conviction, jaccard) are computed vectorized
+    from the support lookup array.
+    names: optional vocabulary to decode integer item ids.
+    stats: optional MiningStats (see generate_rules()).
+    """
+    itemsets = [iset for m in freq_dict.values() for iset in m]
+    sup = [m[iset] for m in freq_dict.values() for iset in m]
+    pos = {iset: i for i, iset in enumerate(itemsets)}
+
+    ab_ids, a_ids, b_ids = [], [], []
+    for k, m in freq_dict.items():
+        if k < 2:
+            continue
+        if stats is not None:
+            stats.start("rules", k)
+            n_rules = len(ab_ids)
+            generated = 0
+        for iset, sup_ab in m.items():
+            if stats is not None:
+                stats.check()
+            ab = pos[iset]
+            # same level-wise consequent pruning as generate_rules()
+            items = sorted(iset)
+            H = [(it,) for it in items]
+            if stats is not None:
+                generated += len(H)
+            while H:
+                passed = []
+                for B in H:
+                    fB = frozenset(B)
+                    a = pos.get(iset - fB)
+                    # NaN support (added below) never passes
+                    if a is None or not sup_ab / sup[a] >= min_conf:
+                        continue
+                    passed.append(B)
+                    b = pos.get(fB)
+                    if b is None:
+                        # consequent missing from freq_dict: unknown support
+                        b = pos[fB] = len(itemsets)
+                        itemsets.append(fB)
+                        sup.append(np.nan)
+                    ab_ids.append(ab)
+                    a_ids.append(a)
+                    b_ids.append(b)
+                if len(passed) > 1 and len(passed[0]) + 1 < k:
+                    H = _join_consequents(passed, items)
+                    if stats is not None:
+                        generated += len(H)
+                else:
+                    H = []
+        if stats is not None:
+            stats.stop(candidates=generated, frequent=len(ab_ids) - n_rules)
+
+    sup = np.array(sup, dtype=float)
+    ab_ids = np.array(ab_ids, dtype=np.int64)
+    a_ids = np.array(a_ids, dtype=np.int64)
+    b_ids = np.array(b_ids, dtype=np.int64)
+    s_ab, s_a, s_b = sup[ab_ids], sup[a_ids], sup[b_ids]
+    conf = s_ab / s_a
+    lift = conf / s_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        conviction = np.where(conf < 1, (1 - s_b) / (1 - conf), np.inf)
+
+    # confidence desc, then lift desc (NaN lift last); stable for ties
+    order = np.lexsort((-np.nan_to_num(lift, nan=-np.inf), -conf))
+    if top_k is not None:
+        order = order[:top_k]
+
+    # decode each itemset once, then gather the label columns by id
+    labels = np.empty(len(itemsets), dtype=object)
+    labels[:] = [
+        tuple(sorted(names[i] for i in iset)) if names is not None else tuple(sorted(iset))
+        for iset in itemsets
+    ]
+    df = pd.DataFrame({
+        'antecedent': labels[a_ids[order]],
+        'consequent': labels[b_ids[order]],
+        'support': s_ab[order],
+        'confidence': conf[order],
+        'lift': lift[order],
+        'leverage': (s_ab - s_a * s_b)[order],
+        'conviction': conviction[order],
+        'jaccard': (s_ab / (s_a + s_b - s_ab))[order],
+        'antecedent_id': a_ids[order],
+        'consequent_id': b_ids[order],
+        'itemset_id': ab_ids[order],
+    })
+    df.attrs['itemsets'] = itemsets
+    return df
+
+def generate_rules(freq_dict, min_conf=0.5, n_tx=1, store=None, top_k=None, columnar=False,
+                   stats=None):
     """
     Generate association rules (A -> B) with confidence >= min_conf.
     Returns a list of dicts with keys: antecedent, consequent, support, confidence, lift.
+    n_tx: number of transactions the raw counts in freq_dict are out of.
+    store: TransactionStore whose vocabulary decodes integer item ids in
+    freq_dict (as returned with decode=False) to names in the rules.
+    top_k: keep only the best top_k rules by (confidence, lift), using a
+    bounded heap instead of sorting every rule.
+    columnar: return a DataFrame from rule_table() instead of a list of dicts.
+    stats: optional MiningStats, one row per itemset size with the
+    consequents tried and passing min_conf.
     """
+    names = store.items if store is not None else None
+    if columnar:
+        return rule_table(freq_dict, min_conf=min_conf, names=names, top_k=top_k,
+                          stats=stats)
     # build quick support lookup
     sup_lookup = {}
     for k, m in freq_dict.items():
         for iset, sup in m.items():
             sup_lookup[iset] = sup
 
+    def make_rule(A, B, sup_ab, conf, lift):
+        # B is a sorted tuple already unless it gets decoded
+        if names is not None:
+            A = [names[i] for i in A]
+            B = tuple(sorted(names[i] for i in B))
+        return {
+            'antecedent': tuple(sorted(A)),
+            'consequent': B,
+            'support': sup_ab,
+            'confidence': conf,
+            'lift': lift
+        }
+
     rules = []
+    heap = []  # top_k only: (confidence, lift key, -seq, A, B, support, lift)
+    seq = 0
+    threshold = min_conf
     for k, m in freq_dict.items():
         if k < 2:
             continue
+        if stats is not None:
+            stats.start("rules", k)
+            generated = n_passed = 0
         for iset, sup_ab in m.items():
-            items = list(iset)
-            # all non-empty proper subsets as antecedents
-            for r in range(1, len(items)):
-                for A in combinations(items, r):
-                    A = frozenset(A)
-                    B = iset - A
+            if stats is not None:
+                stats.check()
+            # consequents grow level-wise (ap-genrules): moving items from A to
+            # B can only lower confidence, so a failed consequent is never
+            # extended (see _join_consequents())
+            items = sorted(iset)
+            H = [(it,) for it in items]
+            if stats is not None:
+                generated += len(H)
+            while H:
+                passed = []
+                for B in H:
+                    fB = frozenset(B)
+                    A = iset - fB
                     sup_a = sup_lookup.get(A, 0)
-                    sup_b = sup_lookup.get(B, 0)
-                    if sup_a == 0 or len(B) == 0:
+                    if sup_a == 0:
                         continue
                     conf = sup_ab / sup_a
-                    if conf >= min_conf:
-                        lift = conf / sup_b if sup_b > 0 else np.nan
-                        rules.append({
-                            'antecedent': tuple(sorted(A)),
-                            'consequent': tuple(sorted(B)),
-                            'support': sup_ab,
-                            'confidence': conf,
-                            'lift': lift
-                        })
+                    if conf < threshold:
+                        continue
+                    passed.append(B)
+                    sup_b = sup_lookup.get(fB, 0)
+                    lift = conf / sup_b if sup_b > 0 else np.nan
+                    if top_k is None:
+                        rules.append(make_rule(A, B, sup_ab, conf, lift))
+                        continue
+                    # NaN lift ranks last; earlier rules win ties
+                    entry = (conf, lift if lift == lift else -np.inf, -seq,
+                             A, B, sup_ab, lift)
+                    seq += 1
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    elif entry[:3] > heap[0][:3]:
+                        heapq.heapreplace(heap, entry)
+                    if len(heap) >= top_k:
+                        # once the heap is full, only rules beating its worst can enter
+                        threshold = max(min_conf, heap[0][0])
+                if stats is not None:
+                    n_passed += len(passed)
+                if len(passed) > 1 and len(passed[0]) + 1 < k:
+                    H = _join_consequents(passed, items)
+                    if stats is not None:
+                        generated += len(H)
+                else:
+                    H = []
+        if stats is not None:
+            stats.stop(candidates=generated, frequent=n_passed)
+
+    if top_k is not None:
+        heap.sort(key=itemgetter(0, 1, 2), reverse=True)
+        return [make_rule(A, B, sup_ab, conf, lift)
+                for conf, _, _, A, B, sup_ab, lift in heap]
+
+    # sort by confidence desc, then lift desc
+    rules.sort(key=lambda x: (x['confidence'], x['lift']), reverse=True)
+    return rules
+
+def generate_closed_rules(closed_dict, min_conf=0.5, store=None):
+    """
+    Rule basis built from closed frequent itemsets only (e.g. eclat(closed=True)).
+    Exact rules G -> C - G (confidence 1) link each closed set C to its minimal
+    generators G; approximate rules C1 -> C2 - C1 link closed sets C1 < C2.
+    Every rule generate_rules() would find follows from this much smaller set.
+    Returns the same list of dicts as generate_rules().
+    """
+    names = store.items if store is not None else None
+    sup = {iset: s for m in closed_dict.values() for iset, s in m.items()}
+    by_item = {}  # item -> closed sets containing it
+    for iset in sup:
+        for it in iset:
+            by_item.setdefault(it, []).append(iset)
+
+    support_cache = {}
+
+    def support(itemset):
+        # the support of any frequent itemset is that of its closure
+        if itemset not in support_cache:
+            candidates = min((by_item.get(it, []) for it in itemset), key=len)
+            support_cache[itemset] = max(
+                (sup[c] for c in candidates if itemset <= c), default=0
+            )
+        return support_cache[itemset]
+
+    rules = []
+
+    def add_rule(A, B, sup_ab, conf):
+        sup_b = support(B)
+        lift = conf / sup_b if sup_b > 0 else np.nan
+        if names is not None:
+            A = [names[i] for i in A]
+            B = [names[i] for i in B]
+        rules.append({
+            'antecedent': tuple(sorted(A)),
+            'consequent': tuple(sorted(B)),
+            'support': sup_ab,
+            'confidence': conf,
+            'lift': lift
+        })
+
+    for C, sup_c in sup.items():
+        if len(C) < 2:
+            continue
+        subs = [c for c in {c for it in C for c in by_item[it]} if c < C]
+
+        # exact rules: the minimal generators G of C are the minimal subsets
+        # not inside any closed proper subset of C (so closure(G) = C).
+        # Found level-wise; apriori_gen prunes supersets of generators
+        if min_conf <= 1:
+            level = [(it,) for it in sorted(C)]
+            while level and len(level[0]) < len(C):
+                keep = []
+                for g in level:
+                    G = frozenset(g)
+                    if any(G <= c for c in subs):
+                        keep.append(g)
+                    else:
+                        add_rule(G, C - G, sup_c, 1.0)
+                level = apriori_gen(keep)
+
+        # approximate rules from every closed proper subset
+        for C1 in subs:
+            conf = sup_c / sup[C1]
+            if conf >= min_conf:
+                add_rule(C1, C - C1, sup_c, conf)
 
     # sort by confidence desc, then lift desc
     rules.sort(key=lambda x: (x['confidence'], x['lift']), reverse=True)
@@ -0,0 +1,59 @@
+import numpy as np
+
+# number of set bits for every possible byte value
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits, axis=-1):
+    """Count set bits in a packed uint8 array along the given axis."""
+    if hasattr(np, "bitwise_count"):
+        counts = np.bitwise_count(bits)
+    else:
+        counts = _POPCOUNT_TABLE[bits]
+    return counts.sum(axis=axis, dtype=np.int64)
+
+
+def pack_bits(rows, cols, n_rows, n_cols):
+    """Packed uint8 bit matrix (n_rows x n_cols) with bits set at (rows, cols)."""
+    bits = np.zeros((n_rows, (n_cols + 7) // 8), dtype=np.uint8)
+    cols = np.asarray(cols, dtype=np.int64)
+    # same bit order as np.packbits: most significant bit first
+    np.bitwise_or.at(bits, (np.asarray(rows, dtype=np.int64), cols >> 3),
+                     (128 >> (cols & 7)).astype(np.uint8))
+    return bits
+
+
+def encode_bitmap(transactions):
+    """
+    Encode transactions once as a packed bit matrix (items x transactions).
+    Returns (items, index, bits) where index maps item -> row in bits.
+    """
+    index = {}
+    rows, cols = [], []
+    for tid, t in enumerate(transactions):
+        for it in set(t):
+            row = index.setdefault(it, len(index))
+            rows.append(row)
+            cols.append(tid)
+    items = list(index)
+    return items, index, pack_bits(rows, cols, len(items), len(transactions))
+
+
+def count_candidates(candidates, index, bits, batch_size=256, stop=None):
+    """
+    Count transactions containing each candidate (all of the same size k)
+    with a vectorized AND over its item rows plus a popcount, in batches.
+    stop: optional function polled between batches; counting is abandoned
+    (None is returned) as soon as it returns a true value.
+    Returns a list of counts aligned with candidates.
+    """
+    counts = []
+    for start in range(0, len(candidates), batch_size):
+        if stop is not None and stop():
+            return None
+        batch = candidates[start:start + batch_size]
+        rows = np.array([[index[it] for it in c] for c in batch], dtype=np.intp)
+        # (batch, k, n_bytes) -> AND over the k item rows
+        joint = np.bitwise_and.reduce(bits[rows], axis=1)
+        counts.extend(popcount(joint).tolist())
+    return counts
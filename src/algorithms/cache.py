@@ -0,0 +1,196 @@
+import hashlib
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from algorithms.apriori import generate_rules
+from preprocessing.store import TransactionStore
+
+# keys of the persisted entries, least recently used first
+INDEX_FILE = "index.pkl"
+
+
+def fingerprint(transactions):
+    """Hash of the cleaned transactions (a list of item collections or a TransactionStore)."""
+    h = hashlib.sha1()
+    if isinstance(transactions, TransactionStore):
+        h.update(json.dumps(transactions.items).encode())
+        h.update(transactions.indptr.tobytes())
+        h.update(transactions.indices.tobytes())
+    else:
+        for t in transactions:
+            h.update("\x1f".join(sorted(map(str, t))).encode())
+            h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def filter_support(freq_dict, min_support):
+    """Frequent itemsets of a lower-support run restricted to min_support."""
+    out = {}
+    for k, m in freq_dict.items():
+        kept = {iset: sup for iset, sup in m.items() if sup >= min_support}
+        if kept:
+            out[k] = kept
+    return out
+
+
+def filter_confidence(rules, min_conf):
+    """Rules of a lower-confidence run restricted to min_conf (list or DataFrame)."""
+    if isinstance(rules, pd.DataFrame):
+        return rules[rules['confidence'] >= min_conf].reset_index(drop=True)
+    return [r for r in rules if r['confidence'] >= min_conf]
+
+
+class MiningCache:
+    """
+    LRU cache of frequent itemsets and rules keyed by a dataset fingerprint
+    plus parameters, with optional pickle persistence in cache_dir.
+    A request at a higher min_support (or min_conf) than a cached run is
+    answered by filtering that run instead of mining again (except for
+    maximal itemsets, which don't filter that way), and a change of
+    min_conf only regenerates rules from the cached frequent itemsets.
+    Persisted entries are indexed in cache_dir, so that reuse also works
+    after a restart, and the least recently used ones are deleted beyond
+    max_disk_entries (default max_entries). A cache_dir belongs to one
+    MiningCache at a time.
+    Safe to share between threads; mining itself runs outside the lock.
+    """
+
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_entries=None):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_entries if max_disk_entries is None else max_disk_entries
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._disk = OrderedDict()  # persisted keys (values unused)
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def frequent(self, miner, transactions, min_support, fp=None, stats=None, **miner_kwargs):
+        """
+        Cached miner(transactions, min_support=..., **miner_kwargs).
+        stats: MiningStats passed to the miner when it actually runs (not part of the key).
+        """
+        fp = fp or fingerprint(transactions)
+        base = ('freq', fp, miner.__name__, tuple(sorted(miner_kwargs.items())))
+        freq = self._get(base + (min_support,))
+        if freq is not None:
+            return freq
+        # any cached run at a lower support already contains the answer (not
+        # for maximal sets: those at a higher support may be missing)
+        lower = self._lower(base, min_support) if not miner_kwargs.get('maximal') else []
+        cached = self._get(base + (max(lower),)) if lower else None
+        if cached is not None:
+            freq = filter_support(cached, min_support)
+        else:
+            self.misses += 1
+            if stats is not None:
+                miner_kwargs = dict(miner_kwargs, stats=stats)
+            freq = miner(transactions, min_support=min_support, **miner_kwargs)
+            if getattr(freq, 'truncated', False):
+                # a run cut short by a limit is incomplete; don't reuse it
+                return freq
+        self._put(base + (min_support,), freq)
+        return freq
+
+    def rules(self, miner, transactions, min_support, min_conf, fp=None,
+              miner_kwargs=None, stats=None, **rule_kwargs):
+        """
+        Cached generate_rules() over the (cached) frequent itemsets of miner.
+        stats: MiningStats passed to generate_rules() when rules are actually generated.
+        """
+        miner_kwargs = miner_kwargs or {}
+        fp = fp or fingerprint(transactions)
+        base = ('rules', fp, miner.__name__, tuple(sorted(miner_kwargs.items())),
+                min_support, tuple(sorted(rule_kwargs.items())))
+        rules = self._get(base + (min_conf,))
+        if rules is not None:
+            return rules
+        lower = self._lower(base, min_conf) if 'top_k' not in rule_kwargs else []
+        cached = self._get(base + (max(lower),)) if lower else None
+        if cached is not None:
+            rules = filter_confidence(cached, min_conf)
+        else:
+            freq = self.frequent(miner, transactions, min_support, fp=fp, **miner_kwargs)
+            rules = generate_rules(freq, min_conf=min_conf, n_tx=len(transactions),
+                                   stats=stats, **rule_kwargs)
+            if getattr(freq, 'truncated', False):
+                return rules
+        self._put(base + (min_conf,), rules)
+        return rules
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lower(self, base, value):
+        # cached thresholds of the same run that are at most value
+        with self._lock:
+            return [key[-1] for key in set(self._entries).union(self._disk)
+                    if key[:-1] == base and key[-1] <= value]
+
+    def _path(self, key):
+        return self.cache_dir / (hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+    def _load_index(self):
+        try:
+            with open(self.cache_dir / INDEX_FILE, "rb") as f:
+                keys = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            keys = []
+        self._disk = OrderedDict((key, None) for key in keys if self._path(key).exists())
+        # files missing from the index would never be found or evicted
+        indexed = {self._path(key) for key in self._disk}
+        for path in self.cache_dir.glob("*.pkl"):
+            if path not in indexed and path.name != INDEX_FILE:
+                path.unlink(missing_ok=True)
+
+    def _save_index(self):
+        with open(self.cache_dir / INDEX_FILE, "wb") as f:
+            pickle.dump(list(self._disk), f)
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if key not in self._disk:
+                return None
+        try:
+            with open(self._path(key), "rb") as f:
+                value = pickle.load(f)
+        except OSError:
+            with self._lock:
+                self._disk.pop(key, None)
+            return None
+        self.hits += 1
+        self._put(key, value, persist=False)
+        return value
+
+    def _put(self, key, value, persist=True):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if not persist or self.cache_dir is None:
+            return
+        with open(self._path(key), "wb") as f:
+            pickle.dump(value, f)
+        with self._lock:
+            self._disk[key] = None
+            self._disk.move_to_end(key)
+            while len(self._disk) > self.max_disk_entries:
+                old, _ = self._disk.popitem(last=False)
+                self._path(old).unlink(missing_ok=True)
+            self._save_index()
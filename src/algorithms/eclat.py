@@ -1,3 +1,15 @@
+import heapq
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from algorithms.bitmap import popcount
+from algorithms.fpgrowth import support_to_count
+from algorithms.limits import Limits, MiningResult
+from preprocessing.store import TransactionStore
+
 def build_vertical_format(transactions):
     """Return dict: itemset (as frozenset) -> TID set."""
     vert = {}
@@ -6,32 +18,414 @@ def build_vertical_format(transactions):
             vert.setdefault(frozenset([it]), set()).add(tid)
     return vert
 
-def eclat_recursive(prefix, items_tidsets, min_support, n_tx, out):
-    while items_tidsets:
-        (item, tidset) = items_tidsets.pop()
+def build_vertical_format_store(store):
+    """Return dict: item id (as frozenset) -> sorted int32 TID array, from a TransactionStore."""
+    return {frozenset([i]): tids for i, tids in enumerate(store.tid_lists()) if len(tids)}
+
+def _to_set(tids, n_tx):
+    return tids if isinstance(tids, set) else set(tids.tolist())
+
+def _to_array(tids, n_tx):
+    if isinstance(tids, np.ndarray):
+        return tids.astype(np.int32, copy=False)
+    return np.array(sorted(tids), dtype=np.int32)
+
+def _to_bitmap(tids, n_tx):
+    dense = np.zeros(n_tx, dtype=bool)
+    dense[tids if isinstance(tids, np.ndarray) else list(tids)] = True
+    return np.packbits(dense)
+
+# tidset representations: name -> (convert from TIDs, intersect, difference, size)
+TIDSET_OPS = {
+    "set": (
+        _to_set,
+        lambda a, b: a & b,
+        lambda a, b: a - b,
+        len,
+    ),
+    # sorted int32 arrays
+    "array": (
+        _to_array,
+        lambda a, b: np.intersect1d(a, b, assume_unique=True),
+        lambda a, b: np.setdiff1d(a, b, assume_unique=True),
+        len,
+    ),
+    # packed bit arrays over all transactions
+    "bitmap": (
+        _to_bitmap,
+        np.bitwise_and,
+        lambda a, b: a & ~b,
+        lambda a: int(popcount(a)),
+    ),
+}
+
+def eclat_recursive(prefix, items_tidsets, min_support, n_tx, out,
+                    diffset=False, tidsets="set", stats=None, limits=None):
+    """
+    Depth-first search for all frequent extensions of `prefix`.
+    items_tidsets: list of (item frozenset, tidset) pairs, explored in order.
+    Uses an explicit stack instead of recursion, so deep itemsets can't hit
+    Python's recursion limit. With diffset=True, every class below the first
+    level stores diffsets (dEclat) instead of tidsets.
+    stats: optional MiningStats; the search is depth-first, so each itemset
+    size gets one row with its totals (no memory peak).
+    limits: optional Limits, checked before each class is extended.
+    Returns the name of the limit that cut the search short, or None.
+    """
+    _, intersect, difference, size = TIDSET_OPS[tidsets]
+    if not n_tx:
+        return
+    members = []
+    for item, tids in items_tidsets:
+        cnt = size(tids)
+        if cnt and cnt / n_tx >= min_support:
+            members.append((item, tids, cnt))
+    # this level is already counted, so keep it whole even if a limit cuts the search
+    for item, _, cnt in members:
+        out[prefix | item] = cnt / n_tx
+
+    # per itemset size: [extensions tried, frequent, seconds]
+    levels = {}
+    reason = None
+
+    # each entry: (prefix, class members, next member to expand, members hold diffsets)
+    stack = [(prefix, members, 0, False)]
+    while stack:
+        prefix, members, i, is_diff = stack.pop()
+        if i >= len(members):
+            continue
+        if stats is not None:
+            stats.check()
+        # come back for the next sibling after this member's subtree
+        stack.append((prefix, members, i + 1, is_diff))
+
+        item, data, cnt = members[i]
         new_prefix = prefix | item
-        support = len(tidset) / n_tx if n_tx else 0
-        if support >= min_support:
-            out[new_prefix] = support
-            # intersect with remaining to build extensions
-            new_items = []
-            for (item2, tidset2) in items_tidsets:
-                inter = tidset & tidset2
-                if inter:
-                    new_items.append((item2, inter))
-            eclat_recursive(new_prefix, new_items, min_support, n_tx, out)
-
-def eclat(transactions, min_support=0.2):
+        out[new_prefix] = cnt / n_tx
+
+        if limits is not None and i + 1 < len(members):
+            if limits.max_len is not None and len(new_prefix) >= limits.max_len:
+                # the extensions would be longer than max_len
+                reason = reason or "max_len"
+                continue
+            exceeded = limits.exceeded(len(members) - i - 1)
+            if exceeded is not None:
+                reason = exceeded
+                break
+
+        # build extensions from the remaining members of the class
+        if stats is not None:
+            t0 = time.perf_counter()
+        children = []
+        for item2, data2, cnt2 in members[i + 1:]:
+            if is_diff:
+                # d(PXY) = d(PY) - d(PX)
+                d = difference(data2, data)
+                c = cnt - size(d)
+            elif diffset:
+                # d(XY) = t(X) - t(Y)
+                d = difference(data, data2)
+                c = cnt - size(d)
+            else:
+                d = intersect(data, data2)
+                c = size(d)
+            if c and c / n_tx >= min_support:
+                children.append((item2, d, c))
+        if stats is not None and i + 1 < len(members):
+            level = levels.setdefault(len(new_prefix) + 1, [0, 0, 0.0])
+            level[0] += len(members) - i - 1
+            level[1] += len(children)
+            level[2] += time.perf_counter() - t0
+        if children:
+            # ascending support keeps intermediate tidsets small
+            children.sort(key=lambda m: m[2])
+            stack.append((new_prefix, children, 0, is_diff or diffset))
+    if stats is not None:
+        for k in sorted(levels):
+            tried, frequent, seconds = levels[k]
+            stats.record("eclat", k, candidates=tried, frequent=frequent, seconds=seconds)
+    return reason
+
+def charm(items_tidsets, min_count):
+    """
+    CHARM: closed frequent itemsets from a list of (item frozenset, TID set)
+    pairs (explored in order, ascending support works best). Uses the four
+    tidset properties to merge items with identical or containing tidsets
+    and a (support, tid sum) hash for subsumption checking. Walks an explicit
+    stack instead of recursing. Returns dict: closed frozenset -> count.
+    """
+    closed = {}
+    by_hash = {}  # (support, sum of tids) -> closed itemsets with that key
+
+    def subsumed(itemset, tids):
+        key = (len(tids), sum(tids))
+        return any(itemset <= c for c in by_hash.get(key, ()))
+
+    # class members are [itemset, tidset, alive]; properties 1/3 kill siblings
+    top = [[item, tids, True] for item, tids in items_tidsets if len(tids) >= min_count]
+    stack = [('extend', top, 0)]
+    while stack:
+        entry = stack.pop()
+        if entry[0] == 'emit':
+            _, itemset, tids = entry
+            if not subsumed(itemset, tids):
+                closed[itemset] = len(tids)
+                by_hash.setdefault((len(tids), sum(tids)), []).append(itemset)
+            continue
+
+        _, members, i = entry
+        while i < len(members) and not members[i][2]:
+            i += 1
+        if i >= len(members):
+            continue
+        stack.append(('extend', members, i + 1))
+
+        x, tx, _ = members[i]
+        children = []
+        for m in members[i + 1:]:
+            if not m[2]:
+                continue
+            y, ty = m[0], m[1]
+            t = tx & ty
+            if len(t) < min_count:
+                continue
+            if tx == ty:
+                # property 1: same tidset, Y always comes with X
+                m[2] = False
+                x = x | y
+                for c in children:
+                    c[0] = c[0] | y
+            elif tx < ty:
+                # property 2: X implies Y
+                x = x | y
+                for c in children:
+                    c[0] = c[0] | y
+            elif tx > ty:
+                # property 3: Y implies X, so Y's class moves under X
+                m[2] = False
+                children.append([x | y, t, True])
+            else:
+                children.append([x | y, t, True])
+        # emit X after its subtree, so closed supersets are seen first
+        stack.append(('emit', x, tx))
+        if children:
+            children.sort(key=lambda c: len(c[1]))
+            stack.append(('extend', children, 0))
+    return closed
+
+def maximal_from_closed(closed):
+    """Maximal frequent itemsets: the closed sets with no closed proper superset."""
+    maximal = []
+    by_item = {}  # item -> maximal itemsets containing it
+    for iset in sorted(closed, key=len, reverse=True):
+        # a superset must contain every item, so check the shortest posting list
+        candidates = min((by_item.get(it, []) for it in iset), key=len)
+        if any(iset < m for m in candidates):
+            continue
+        maximal.append(iset)
+        for it in iset:
+            by_item.setdefault(it, []).append(iset)
+    return {m: closed[m] for m in maximal}
+
+def top_k_itemsets(transactions, k, min_len=2, decode=True):
+    """
+    The k most frequent itemsets with at least min_len items, without a fixed
+    min_support. Eclat depth-first search over the vertical format, exploring
+    the most frequent extensions first; a min-heap holds the best k found so
+    far, and once it is full its smallest count becomes the support threshold,
+    so nothing below the final threshold is ever expanded.
+    transactions: list of sets, or a TransactionStore (see eclat()).
+    Returns dict: {k: {frozenset(items): support}} (ties at the k-th
+    support are broken arbitrarily).
+    """
+    n_tx = len(transactions)
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    if store is not None:
+        vert = build_vertical_format_store(store)
+    else:
+        vert = build_vertical_format(transactions)
+    best = []  # min-heap of (count, seq, itemset)
+    seq = 0
+
+    def threshold():
+        # an itemset (and so any extension) must beat the current k-th best
+        return best[0][0] if len(best) >= k else 0
+
+    if k > 0 and n_tx:
+        members = [(item, _to_set(tids, n_tx), len(tids)) for item, tids in vert.items()]
+        # descending support, so good itemsets raise the threshold early;
+        # the stack pops the last entry, hence the reversed order
+        members.sort(key=lambda m: m[2])
+        stack = [(frozenset(), members)]
+        while stack:
+            prefix, members = stack.pop()
+            if not members:
+                continue
+            item, tids, cnt = members.pop()
+            if cnt <= threshold():
+                # the rest of the class is even less frequent
+                continue
+            stack.append((prefix, members))
+            new_prefix = prefix | item
+            if len(new_prefix) >= min_len:
+                seq += 1
+                if len(best) < k:
+                    heapq.heappush(best, (cnt, seq, new_prefix))
+                else:
+                    heapq.heapreplace(best, (cnt, seq, new_prefix))
+
+            children = []
+            for item2, tids2, cnt2 in members:
+                if cnt2 <= threshold():
+                    continue
+                d = tids & tids2
+                if len(d) > threshold():
+                    children.append((item2, d, len(d)))
+            if children:
+                children.sort(key=lambda m: m[2])
+                stack.append((new_prefix, children))
+
+    by_k = {}
+    for cnt, _, iset in best:
+        by_k.setdefault(len(iset), {})[iset] = cnt / n_tx
+    if store is not None and decode:
+        return store.decode_itemsets(by_k)
+    return by_k
+
+# per-worker state set up by _attach_shared()
+_SHARED = {}
+
+def _attach_shared(shm_name, shape, items, counts, n_tx, min_support, diffset, tidsets):
+    """Pool initializer: map the shared first-level bit matrix into this worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _SHARED.update(
+        shm=shm,  # keep a reference so the buffer stays mapped
+        bits=np.ndarray(shape, dtype=np.uint8, buffer=shm.buf),
+        items=items, counts=counts, n_tx=n_tx,
+        min_support=min_support, diffset=diffset, tidsets=tidsets,
+    )
+
+def _mine_class(i):
+    """Mine the equivalence class of first-level item i against its tail."""
+    s = _SHARED
+    n_tx, tidsets, bits = s['n_tx'], s['tidsets'], s['bits']
+
+    def convert(row):
+        if tidsets == "bitmap":
+            return row
+        tids = np.flatnonzero(np.unpackbits(row, count=n_tx)).astype(np.int32)
+        return tids if tidsets == "array" else set(tids.tolist())
+
+    item = s['items'][i]
+    out = {item: s['counts'][i] / n_tx}
+    # intersect the whole tail with one vectorized AND, then convert survivors
+    joint = bits[i + 1:] & bits[i]
+    counts = popcount(joint, axis=1)
+    ext = [(s['items'][j], convert(joint[j - i - 1]), counts[j - i - 1])
+           for j in range(i + 1, len(s['items']))
+           if counts[j - i - 1] and counts[j - i - 1] / n_tx >= s['min_support']]
+    ext.sort(key=lambda m: m[2])
+    eclat_recursive(item, [(it, t) for it, t, _ in ext], s['min_support'], n_tx, out,
+                    diffset=s['diffset'], tidsets=tidsets)
+    return out
+
+def _eclat_parallel(items, n_tx, min_support, diffset, tidsets, workers):
+    """
+    Hand each first-level equivalence class to a process pool. Tidsets are
+    shared once through a packed bit matrix in shared memory, and classes
+    are submitted largest-first (by support x tail length) to balance load.
+    """
+    counts = [len(tids) for _, tids in items]
+    bits = np.stack([_to_bitmap(tids, n_tx) for _, tids in items])
+    shm = shared_memory.SharedMemory(create=True, size=max(bits.nbytes, 1))
+    out = {}
+    try:
+        np.ndarray(bits.shape, dtype=np.uint8, buffer=shm.buf)[:] = bits
+        del bits
+        cost = [counts[i] * (len(items) - i) for i in range(len(items))]
+        order = sorted(range(len(items)), key=lambda i: cost[i], reverse=True)
+        init_args = (shm.name, (len(items), (n_tx + 7) // 8), [it for it, _ in items],
+                     counts, n_tx, min_support, diffset, tidsets)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared,
+                                 initargs=init_args) as pool:
+            futures = [pool.submit(_mine_class, i) for i in order]
+            for fut in as_completed(futures):
+                out.update(fut.result())
+    finally:
+        shm.close()
+        shm.unlink()
+    return out
+
+def eclat(transactions, min_support=0.2, diffset=False, tidsets="set", workers=None,
+          decode=True, closed=False, maximal=False, stats=None, max_len=None,
+          max_candidates=None, time_budget=None, memory_budget=None):
     """
     Eclat algorithm in vertical format.
-    Returns dict: {k: {frozenset(items): support}}
+    closed / maximal: return only the closed (CHARM) or maximal frequent
+    itemsets; these modes use Python set tidsets and run serially.
+    transactions: list of sets, or a TransactionStore (mined on integer ids;
+    decode=False keeps the ids in the output instead of product names).
+    diffset: use dEclat diffsets below the first level.
+    tidsets: "set" (Python sets), "array" (sorted int32 arrays) or
+    "bitmap" (packed NumPy bit arrays).
+    workers: if > 1, mine the first-level equivalence classes in a process pool.
+    stats: optional MiningStats; level 1 covers building the vertical format,
+    deeper levels are recorded by the serial search only.
+    max_len, max_candidates, time_budget, memory_budget: optional limits
+    (see limits.Limits) for the serial search. A run that hits one stops
+    cleanly and returns what it found with truncated=True and the reason.
+    Every frequent item is in the result; after a budget ran out, larger
+    itemsets are whatever the depth-first search reached (level_reached 1).
+    Returns dict: {k: {frozenset(items): support}} (a MiningResult)
     """
-    vert = build_vertical_format(transactions)
-    items = list(vert.items())
+    if tidsets not in TIDSET_OPS:
+        raise ValueError(f"Unknown tidset representation: {tidsets!r}")
+    limited = any(x is not None for x in (max_len, max_candidates, time_budget, memory_budget))
+    if limited and (closed or maximal or (workers is not None and workers > 1)):
+        raise ValueError("limits only apply to the serial search without closed/maximal")
+    limits = Limits(max_len, max_candidates, time_budget, memory_budget) if limited else None
+    if stats is not None:
+        stats.start("eclat", 1)
+    convert = TIDSET_OPS[tidsets][0]
+    n_tx = len(transactions)
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    if store is not None:
+        vert = build_vertical_format_store(store)
+    else:
+        vert = build_vertical_format(transactions)
+    # ascending support, so the first-level classes stay small
+    items = sorted(vert.items(), key=lambda kv: len(kv[1]))
+    reason = None
+    if stats is not None:
+        n_frequent = sum(1 for _, tids in items if len(tids) / n_tx >= min_support)
+        stats.stop(candidates=len(items), frequent=n_frequent)
     out = {}
-    eclat_recursive(frozenset(), items, min_support, len(transactions), out)
+    if closed or maximal:
+        if diffset or tidsets != "set" or (workers is not None and workers > 1):
+            raise ValueError("closed/maximal modes only support serial set tidsets")
+        if n_tx:
+            found = charm([(it, _to_set(tids, n_tx)) for it, tids in items],
+                          support_to_count(min_support, n_tx))
+            if maximal:
+                found = maximal_from_closed(found)
+            out = {iset: cnt / n_tx for iset, cnt in found.items()}
+    elif workers is not None and workers > 1 and n_tx:
+        items = [(it, tids) for it, tids in items if len(tids) / n_tx >= min_support]
+        if items:
+            out = _eclat_parallel(items, n_tx, min_support, diffset, tidsets, workers)
+    else:
+        items = [(item, convert(tids, n_tx)) for item, tids in items]
+        reason = eclat_recursive(frozenset(), items, min_support, n_tx, out,
+                                 diffset=diffset, tidsets=tidsets, stats=stats, limits=limits)
     # group by k
     by_k = {}
     for iset, sup in out.items():
         by_k.setdefault(len(iset), {})[iset] = sup
-    return by_k
+    if store is not None and decode:
+        by_k = store.decode_itemsets(by_k)
+    level_reached = None
+    if reason is not None and reason != "max_len":
+        # only the first level is known to be complete
+        level_reached = min(1, max(by_k, default=0))
+    return MiningResult(by_k, truncated=reason is not None, reason=reason,
+                        level_reached=level_reached)
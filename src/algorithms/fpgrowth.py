@@ -0,0 +1,109 @@
+import math
+
+from preprocessing.store import TransactionStore
+
+
+class FPNode:
+    """Node of an FP-tree: one item on a shared prefix path with its count."""
+
+    __slots__ = ("item", "count", "parent", "children")
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+def build_fptree(paths, min_count):
+    """
+    Build an FP-tree from (items, count) paths.
+    First pass counts items, second pass inserts each path with its frequent
+    items sorted by descending count. Returns (header, item_counts) where
+    header maps item -> list of tree nodes holding that item.
+    """
+    item_counts = {}
+    for items, cnt in paths:
+        for it in items:
+            item_counts[it] = item_counts.get(it, 0) + cnt
+    item_counts = {it: c for it, c in item_counts.items() if c >= min_count}
+
+    root = FPNode(None, None)
+    header = {}
+    for items, cnt in paths:
+        ordered = sorted(
+            (it for it in items if it in item_counts),
+            key=lambda it: (-item_counts[it], it)
+        )
+        node = root
+        for it in ordered:
+            child = node.children.get(it)
+            if child is None:
+                child = FPNode(it, node)
+                node.children[it] = child
+                header.setdefault(it, []).append(child)
+            child.count += cnt
+            node = child
+    return header, item_counts
+
+
+def mine_fptree(header, item_counts, suffix, min_count, out):
+    """Mine an FP-tree by recursing into conditional trees (no candidates)."""
+    # least frequent items first, so each conditional base is small
+    for it in sorted(item_counts, key=lambda x: (item_counts[x], x)):
+        new_suffix = suffix | {it}
+        out[new_suffix] = item_counts[it]
+
+        # conditional pattern base: prefix path of every node holding `it`
+        base = []
+        for node in header[it]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                base.append((path, node.count))
+
+        if base:
+            cond_header, cond_counts = build_fptree(base, min_count)
+            if cond_counts:
+                mine_fptree(cond_header, cond_counts, new_suffix, min_count, out)
+
+
+def support_to_count(min_support, n_tx):
+    """Smallest count c >= 1 with c / n_tx >= min_support (same test as apriori)."""
+    c = max(math.ceil(min_support * n_tx), 1)
+    # guard against float rounding on either side of the boundary
+    while c > 1 and (c - 1) / n_tx >= min_support:
+        c -= 1
+    while c / n_tx < min_support:
+        c += 1
+    return c
+
+
+def fpgrowth(transactions, min_support=0.2, decode=True):
+    """
+    FP-Growth algorithm.
+    transactions: list of sets, or a TransactionStore (mined on integer ids;
+    decode=False keeps the ids in the output instead of product names).
+    Returns dict: {k: {frozenset(items): support}}
+    """
+    n_tx = len(transactions)
+    if not n_tx:
+        return {}
+    min_count = support_to_count(min_support, n_tx)
+
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    rows = store.rows() if store is not None else transactions
+    header, item_counts = build_fptree([(set(t), 1) for t in rows], min_count)
+    out = {}
+    mine_fptree(header, item_counts, frozenset(), min_count, out)
+
+    # group by k
+    by_k = {}
+    for iset, cnt in out.items():
+        by_k.setdefault(len(iset), {})[iset] = cnt / n_tx
+    if store is not None and decode:
+        return store.decode_itemsets(by_k)
+    return by_k
@@ -0,0 +1,111 @@
+from algorithms.apriori import apriori_gen, count_items, count_with_trie, generate_rules
+
+
+def fup_update(old_counts, old_tx, new_tx, min_support):
+    """
+    FUP-style update of frequent itemsets after appending transactions.
+    old_counts: {tuple(sorted items): raw count} of the itemsets that were
+    frequent in old_tx. old_tx / new_tx: lists of sorted item tuples.
+    An itemset that was not frequent before can only become frequent if it
+    is frequent within new_tx, so old_tx is scanned (one pass per level) only
+    for those candidates; everything else is updated from the increment.
+    Returns {tuple(sorted items): raw count} over old_tx + new_tx.
+    """
+    n_old, n_new = len(old_tx), len(new_tx)
+    n_tx = n_old + n_new
+    if not n_tx:
+        return {}
+    if not n_new:
+        # nothing appended: the old frequent itemsets stand as they are
+        return dict(old_counts)
+    inc_min = min_support * n_new
+
+    def frequent(cnt):
+        return cnt / n_tx >= min_support
+
+    # level 1
+    inc_counts = count_items(new_tx)
+    updated = {}
+    rescan = []
+    for c, cnt in old_counts.items():
+        if len(c) == 1:
+            total = cnt + inc_counts.get(c[0], 0)
+            if frequent(total):
+                updated[c] = total
+    for it, inc in inc_counts.items():
+        if (it,) not in old_counts and inc and inc >= inc_min:
+            rescan.append(it)
+    if rescan:
+        old_item_counts = count_items(old_tx)
+        for it in rescan:
+            total = inc_counts[it] + old_item_counts.get(it, 0)
+            if frequent(total):
+                updated[(it,)] = total
+
+    # only frequent items can appear in larger itemsets
+    items = {c[0] for c in updated}
+    new_sorted = [tuple(it for it in t if it in items) for t in new_tx]
+    old_sorted = None  # filtered lazily, only if old_tx has to be rescanned
+
+    current = sorted(updated)
+    while current:
+        cand = apriori_gen(current)
+        if not cand:
+            break
+        inc = count_with_trie(cand, new_sorted)
+        level = []
+        rescan = []
+        for c, cnt in zip(cand, inc):
+            if c in old_counts:
+                total = old_counts[c] + cnt
+                if frequent(total):
+                    updated[c] = total
+                    level.append(c)
+            elif cnt and cnt >= inc_min:
+                rescan.append((c, cnt))
+        if rescan:
+            if old_sorted is None:
+                old_sorted = [tuple(it for it in t if it in items) for t in old_tx]
+            old = count_with_trie([c for c, _ in rescan], old_sorted)
+            for (c, cnt), old_cnt in zip(rescan, old):
+                if frequent(cnt + old_cnt):
+                    updated[c] = cnt + old_cnt
+                    level.append(c)
+        current = sorted(level)
+    return updated
+
+
+class IncrementalMiner:
+    """
+    Keeps the raw counts of the frequent itemsets of a growing transaction
+    history so appended batches are absorbed with fup_update() instead of
+    re-mining everything. Items must be sortable (names or integer ids).
+    """
+
+    def __init__(self, min_support=0.2, min_conf=0.5):
+        self.min_support = min_support
+        self.min_conf = min_conf
+        self.transactions = []
+        self.counts = {}
+
+    def fit(self, transactions):
+        """Mine an initial history from scratch."""
+        self.transactions = []
+        self.counts = {}
+        return self.update(transactions)
+
+    def update(self, new_transactions):
+        """Append a batch and return (frequent itemsets, rules) for the whole history."""
+        new_tx = [tuple(sorted(set(t))) for t in new_transactions]
+        self.counts = fup_update(self.counts, self.transactions, new_tx, self.min_support)
+        self.transactions.extend(new_tx)
+        freq = self.frequent()
+        return freq, generate_rules(freq, min_conf=self.min_conf, n_tx=len(self.transactions))
+
+    def frequent(self):
+        """Current frequent itemsets as {k: {frozenset(items): support}}."""
+        n_tx = len(self.transactions)
+        by_k = {}
+        for iset, cnt in self.counts.items():
+            by_k.setdefault(len(iset), {})[frozenset(iset)] = cnt / n_tx
+        return by_k
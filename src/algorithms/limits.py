@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+
+LIMIT_REASONS = ("max_len", "max_candidates", "time_budget", "memory_budget")
+
+
+class MiningResult(dict):
+    """
+    Frequent itemsets {k: {frozenset(items): support}} from apriori() or
+    eclat(). truncated is True when a limit stopped the run early: reason
+    names it (one of LIMIT_REASONS) and level_reached is the largest itemset
+    size up to which the result is complete. Apriori stops after a level,
+    so that is its largest size; eclat's depth-first search may also have
+    found some larger itemsets.
+    """
+
+    def __init__(self, itemsets=(), truncated=False, reason=None, level_reached=None):
+        super().__init__(itemsets)
+        self.truncated = truncated
+        self.reason = reason
+        self.level_reached = max(self, default=0) if level_reached is None else level_reached
+
+
+def current_memory():
+    """Resident memory of this process in bytes (peak RSS where that's all there is), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Limits:
+    """
+    Budget of one mining run.
+    max_len: largest itemset size to mine.
+    max_candidates: total number of candidate supports to count.
+    time_budget: seconds from the start of the run.
+    memory_budget: bytes of resident memory the run may add. This is the
+    memory of the whole process, so allocations of other threads (e.g.
+    engines mining at the same time) count against it too.
+    """
+
+    # reading the process memory isn't free, so it is sampled at most this often (s)
+    MEMORY_CHECK_INTERVAL = 0.05
+
+    def __init__(self, max_len=None, max_candidates=None, time_budget=None, memory_budget=None):
+        self.max_len = max_len
+        self.max_candidates = max_candidates
+        self.candidates = 0
+        self.reason = None
+        now = time.perf_counter()
+        self._deadline = now + time_budget if time_budget is not None else None
+        self._memory_budget = memory_budget
+        self._memory_start = current_memory() if memory_budget is not None else None
+        self._memory_checked = now
+
+    @property
+    def bounded(self):
+        """True if a budget (not just max_len) has to be checked while mining."""
+        return (self.max_candidates is not None or self._deadline is not None
+                or self._memory_start is not None)
+
+    def exceeded(self, n_candidates=0):
+        """
+        Name of the limit that counting n_candidates more candidates would
+        break (also kept in self.reason), or None. Candidates that fit are
+        added to the total.
+        """
+        if self.max_candidates is not None and self.candidates + n_candidates > self.max_candidates:
+            self.reason = "max_candidates"
+        elif self._deadline is not None or self._memory_start is not None:
+            now = time.perf_counter()
+            if self._deadline is not None and now > self._deadline:
+                self.reason = "time_budget"
+            elif self._memory_start is not None \
+                    and now - self._memory_checked >= self.MEMORY_CHECK_INTERVAL:
+                self._memory_checked = now
+                if current_memory() - self._memory_start > self._memory_budget:
+                    self.reason = "memory_budget"
+        if self.reason is None:
+            self.candidates += n_candidates
+        return self.reason
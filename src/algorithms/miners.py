@@ -0,0 +1,6 @@
+from algorithms.apriori import apriori
+from algorithms.eclat import eclat
+from algorithms.fpgrowth import fpgrowth
+
+# the mining engines by name (CLI, UI, benchmarks and SON)
+MINERS = {"apriori": apriori, "eclat": eclat, "fpgrowth": fpgrowth}
@@ -0,0 +1,93 @@
+import pandas as pd
+
+
+class RuleIndex:
+    """
+    Inverted index over association rules for fast recommendation queries.
+    Maps each antecedent item, and each antecedent itemset, to its rules
+    already ranked by confidence then lift, so lookups never rescan the
+    rule list. Accepts the list of dicts or the DataFrame from generate_rules().
+    """
+
+    def __init__(self, rules):
+        if isinstance(rules, pd.DataFrame):
+            cols = ['antecedent', 'consequent', 'support', 'confidence', 'lift']
+            rows = list(rules[cols].itertuples(index=False, name=None))
+        else:
+            rows = [(r['antecedent'], r['consequent'], r['support'],
+                     r['confidence'], r['lift']) for r in rules]
+        # rank by confidence desc, then lift desc (NaN lift last); stable for ties
+        rows.sort(key=lambda r: (r[3], r[4] if r[4] == r[4] else float('-inf')),
+                  reverse=True)
+        self.rules = rows
+
+        self._by_item = {}        # item -> ranked rule ids with item in antecedent
+        self._by_antecedent = {}  # frozenset(antecedent) -> ranked rule ids
+        self._antecedents = {}    # item -> antecedent itemsets containing item
+        for rid, (ante, _, _, _, _) in enumerate(rows):
+            key = frozenset(ante)
+            if key not in self._by_antecedent:
+                self._by_antecedent[key] = []
+                for it in key:
+                    self._antecedents.setdefault(it, []).append(key)
+            self._by_antecedent[key].append(rid)
+            for it in ante:
+                self._by_item.setdefault(it, []).append(rid)
+        self._item_cache = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def rules_for(self, antecedent):
+        """Rules whose antecedent is exactly `antecedent`, best first, as dicts."""
+        ids = self._by_antecedent.get(frozenset(antecedent), [])
+        return [self._rule_dict(rid) for rid in ids]
+
+    def for_item(self, item):
+        """
+        Items associated with `item` (item anywhere in the antecedent), one
+        row per consequent item keeping its best rule. Results are cached.
+        """
+        if item not in self._item_cache:
+            self._item_cache[item] = self._aggregate(self._by_item.get(item, []), ())
+        return self._item_cache[item]
+
+    def recommend(self, basket, top_n=None):
+        """
+        Given a basket, recommend items from every rule whose antecedent is
+        contained in the basket. Items already in the basket are skipped.
+        """
+        basket = frozenset(basket)
+        matched = set()
+        for it in basket:
+            for ante in self._antecedents.get(it, ()):
+                if ante <= basket:
+                    matched.add(ante)
+        ids = sorted(rid for ante in matched for rid in self._by_antecedent[ante])
+        out = self._aggregate(ids, basket)
+        return out[:top_n] if top_n is not None else out
+
+    def _rule_dict(self, rid):
+        ante, cons, sup, conf, lift = self.rules[rid]
+        return {'antecedent': ante, 'consequent': cons, 'support': sup,
+                'confidence': conf, 'lift': lift}
+
+    def _aggregate(self, ids, exclude):
+        # ids are in rank order, so the first rule seen per item is its best
+        agg = {}
+        for rid in ids:
+            _, cons, sup, conf, lift = self.rules[rid]
+            for c in cons:
+                if c not in agg and c not in exclude:
+                    agg[c] = (conf, sup, lift)
+        out = [
+            {
+                'item': c,
+                'confidence_pct': conf * 100,
+                'support_pct': sup * 100,
+                'lift': lift
+            }
+            for c, (conf, sup, lift) in agg.items()
+        ]
+        out.sort(key=lambda x: (x['confidence_pct'], x['lift']), reverse=True)
+        return out
@@ -0,0 +1,150 @@
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from algorithms.apriori import apriori, apriori_gen, count_items, count_itemsets
+from preprocessing.store import TransactionStore
+
+# background verification runs here unless the caller passes an executor
+_EXECUTOR = None
+
+
+def sample_transactions(transactions, sample_size, seed=None):
+    """Uniform random sample (without replacement) of a list or a TransactionStore."""
+    n_tx = len(transactions)
+    if sample_size >= n_tx:
+        return transactions
+    if isinstance(transactions, TransactionStore):
+        rng = np.random.default_rng(seed)
+        return transactions.take(np.sort(rng.choice(n_tx, sample_size, replace=False)))
+    return random.Random(seed).sample(list(transactions), sample_size)
+
+
+def error_bound(n, delta=0.05):
+    """
+    Hoeffding bound: with probability >= 1 - delta, a support estimated on n
+    random transactions is within this distance of the true support.
+    """
+    return math.sqrt(math.log(2 / delta) / (2 * n))
+
+
+def negative_border(itemsets, items):
+    """
+    Itemsets that are not in `itemsets` but all of whose proper subsets are
+    (itemsets: set of sorted tuples, items: every item of the dataset).
+    """
+    border = [(it,) for it in sorted(items) if (it,) not in itemsets]
+    by_k = {}
+    for c in itemsets:
+        by_k.setdefault(len(c), []).append(c)
+    for k in sorted(by_k):
+        border.extend(c for c in apriori_gen(sorted(by_k[k])) if c not in itemsets)
+    return border
+
+
+def _group(supports, store, decode):
+    by_k = {}
+    for c, sup in supports.items():
+        by_k.setdefault(len(c), {})[frozenset(c)] = sup
+    if store is not None and decode:
+        return store.decode_itemsets(by_k)
+    return by_k
+
+
+def preview(transactions, min_support=0.2, sample_size=10_000, delta=0.05, seed=None,
+            decode=True):
+    """
+    Approximate frequent itemsets from a random sample (Toivonen's method).
+    The sample is mined at min_support lowered by the Hoeffding error bound
+    (never below min_support / 2), so with probability about 1 - delta no
+    truly frequent itemset is missed; the negative border of that result is
+    kept so verify() can tell whether the sample missed anything.
+    Returns dict with:
+      'freq': {k: {frozenset(items): estimated support}} (estimate >= min_support)
+      'intervals': {frozenset(items): (low, high)} for every itemset found at
+                   the lowered threshold, at confidence 1 - delta
+      'threshold', 'error', 'n_sample', 'n_tx', 'min_support'
+      'candidates' / 'border': sorted item tuples used by verify()
+    """
+    n_tx = len(transactions)
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    sample = sample_transactions(transactions, sample_size, seed=seed)
+    n = len(sample)
+    # a "sample" of everything is exact
+    eps = error_bound(n, delta) if n and n < n_tx else 0.0
+    threshold = max(min_support - eps, min_support / 2)
+
+    found = {}
+    if n:
+        local = apriori(sample, min_support=threshold, decode=False)
+        found = {tuple(sorted(iset)): sup for m in local.values() for iset, sup in m.items()}
+    if store is not None:
+        items = range(store.n_items)
+    else:
+        items = {it for t in sample for it in t}
+
+    intervals = {c: (max(sup - eps, 0.0), min(sup + eps, 1.0)) for c, sup in found.items()}
+    if store is not None and decode:
+        intervals = {store.decode(c): iv for c, iv in intervals.items()}
+    else:
+        intervals = {frozenset(c): iv for c, iv in intervals.items()}
+    return {
+        'freq': _group({c: s for c, s in found.items() if s >= min_support}, store, decode),
+        'intervals': intervals,
+        'threshold': threshold,
+        'error': eps,
+        'n_sample': n,
+        'n_tx': n_tx,
+        'min_support': min_support,
+        'candidates': list(found),
+        'border': negative_border(set(found), items),
+    }
+
+
+def verify(transactions, result, decode=True):
+    """
+    Check a preview() result against the full transactions in one counting
+    pass over its candidates and negative border. If no border itemset turns
+    out frequent, the frequent candidates are exactly the frequent itemsets;
+    otherwise the sample missed something and the full data is mined again.
+    Returns dict with 'freq' ({k: {frozenset(items): support}}, exact),
+    'complete' (the sample found everything) and 'missed' (border itemsets
+    that are frequent).
+    """
+    n_tx = len(transactions)
+    min_support = result['min_support']
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    if not n_tx:
+        return {'freq': {}, 'complete': True, 'missed': []}
+
+    border = list(result['border'])
+    if store is None:
+        # the border only covers items seen in the sample
+        known = {c[0] for c in border if len(c) == 1}
+        known.update(it for c in result['candidates'] if len(c) == 1 for it in c)
+        border.extend((it,) for it in count_items(transactions) if it not in known)
+    counts = count_itemsets(transactions, result['candidates'] + border)
+
+    missed = [c for c in border if counts[c] / n_tx >= min_support]
+    if missed:
+        freq = apriori(transactions, min_support=min_support, decode=decode)
+    else:
+        freq = _group({c: counts[c] / n_tx for c in result['candidates']
+                       if counts[c] / n_tx >= min_support}, store, decode)
+    if store is not None and decode:
+        missed = [store.decode(c) for c in missed]
+    else:
+        missed = [frozenset(c) for c in missed]
+    return {'freq': freq, 'complete': not missed, 'missed': missed}
+
+
+def verify_in_background(transactions, result, executor=None):
+    """Run verify() in a background thread. Returns a concurrent.futures.Future."""
+    global _EXECUTOR
+    if executor is None:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1)
+        executor = _EXECUTOR
+    return executor.submit(verify, transactions, result)
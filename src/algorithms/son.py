@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorithms.apriori import count_itemsets
+from algorithms.miners import MINERS
+from preprocessing.store import open_store
+
+
+def _chunks(n_tx, chunk_size):
+    return [(start, min(start + chunk_size, n_tx)) for start in range(0, n_tx, chunk_size)]
+
+
+def _mine_chunk(path, start, stop, min_support, miner):
+    """Phase 1: local frequent itemsets (sorted id tuples) of one chunk."""
+    store, _ = open_store(path)
+    chunk = store.slice(start, stop)
+    local = MINERS[miner](chunk, min_support=min_support, decode=False)
+    return [tuple(sorted(iset)) for m in local.values() for iset in m]
+
+
+def _count_chunk(path, start, stop, candidates):
+    """Phase 2: counts of every candidate in one chunk, as {k: int64 array}."""
+    store, _ = open_store(path)
+    counts = count_itemsets(store.slice(start, stop),
+                            [c for cands in candidates.values() for c in cands])
+    return {k: np.array([counts[c] for c in cands], dtype=np.int64)
+            for k, cands in candidates.items()}
+
+
+def son(path, min_support=0.2, chunk_size=100_000, miner="apriori", workers=None,
+        decode=True):
+    """
+    SON (partitioned) mining of an encoded transaction file (see
+    preprocessing.store.save_store) that doesn't have to fit in memory.
+    Phase 1 mines each chunk of chunk_size transactions with an existing
+    engine (miner: "apriori", "eclat" or "fpgrowth") at the same relative
+    min_support; any globally frequent itemset is frequent in at least one
+    chunk, so the union of the local results is a complete candidate set.
+    Phase 2 counts every candidate over all chunks in one more pass, which
+    makes the result exact. Chunks are memory-mapped slices, so only one
+    chunk per worker is held in memory at a time.
+    workers: if > 1, chunks are processed in a process pool.
+    Returns dict: {k: {frozenset(items): support}}
+    """
+    if miner not in MINERS:
+        raise ValueError(f"Unknown miner: {miner!r}")
+    store, _ = open_store(path)
+    n_tx = len(store)
+    if not n_tx:
+        return {}
+    chunks = _chunks(n_tx, chunk_size)
+    path = str(path)
+
+    def run(fn, args_list):
+        if workers is not None and workers > 1 and len(args_list) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(fn, *zip(*args_list)))
+        return [fn(*args) for args in args_list]
+
+    # phase 1: merge the local frequent itemsets into global candidates
+    local = run(_mine_chunk, [(path, a, b, min_support, miner) for a, b in chunks])
+    by_k = {}
+    for iset in set().union(*local):
+        by_k.setdefault(len(iset), []).append(iset)
+    candidates = {k: sorted(c) for k, c in by_k.items()}
+    if not candidates:
+        return {}
+
+    # phase 2: exact global counts
+    totals = {k: np.zeros(len(c), dtype=np.int64) for k, c in candidates.items()}
+    for counts in run(_count_chunk, [(path, a, b, candidates) for a, b in chunks]):
+        for k, cnt in counts.items():
+            totals[k] += cnt
+
+    L = {}
+    for k in sorted(candidates):
+        Lk = {frozenset(c): cnt / n_tx
+              for c, cnt in zip(candidates[k], totals[k].tolist())
+              if cnt / n_tx >= min_support}
+        if Lk:
+            L[k] = Lk
+    if decode:
+        return store.decode_itemsets(L)
+    return L
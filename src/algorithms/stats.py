@@ -0,0 +1,99 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+class MiningCancelled(Exception):
+    """Raised inside a miner after MiningStats.cancel() was called."""
+
+
+class MiningStats:
+    """
+    Per-level instrumentation for apriori(), eclat() and generate_rules()
+    (pass it as stats=). Every finished level is one row in `levels`:
+    stage, level, candidates (generated), pruned (dropped by subset pruning
+    before counting), frequent (kept; rules for generate_rules), seconds,
+    peak_kb.
+    callback: optional function called with each new row.
+    track_memory: record the memory a level allocated on top of what was
+    already allocated when it started (tracemalloc peak); tracing starts
+    on first use and stops on close() (or at the end of a with block).
+    cancel() (e.g. from another thread) makes the miner using this object
+    raise MiningCancelled soon: apriori() polls it while counting a level,
+    eclat() at every search step and generate_rules() at every itemset.
+    """
+
+    def __init__(self, track_memory=False, callback=None):
+        self.track_memory = track_memory
+        self.callback = callback
+        self.levels = []
+        self._current = None
+        self._tracing = False
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        """Raise MiningCancelled if cancel() was called."""
+        if self.cancelled:
+            raise MiningCancelled()
+
+    def start(self, stage, level):
+        """Begin timing a level."""
+        self.check()
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        else:
+            base = 0
+        self._current = (stage, level, base, time.perf_counter())
+
+    def stop(self, candidates=0, pruned=0, frequent=0):
+        """Finish the level begun by start() and record its counts."""
+        stage, level, base, t0 = self._current
+        self._current = None
+        peak_kb = None
+        if self.track_memory and tracemalloc.is_tracing():
+            peak_kb = (tracemalloc.get_traced_memory()[1] - base) / 1024
+        self.record(stage, level, candidates, pruned, frequent,
+                    time.perf_counter() - t0, peak_kb)
+
+    def record(self, stage, level, candidates=0, pruned=0, frequent=0, seconds=0.0,
+               peak_kb=None):
+        """Add a level measured by the caller (e.g. a depth of a DFS)."""
+        row = {
+            'stage': stage,
+            'level': level,
+            'candidates': candidates,
+            'pruned': pruned,
+            'frequent': frequent,
+            'seconds': seconds,
+            'peak_kb': peak_kb
+        }
+        self.levels.append(row)
+        if self.callback is not None:
+            self.callback(row)
+
+    def total_seconds(self, stage=None):
+        return sum(r['seconds'] for r in self.levels if stage is None or r['stage'] == stage)
+
+    def to_frame(self):
+        """Levels as a DataFrame, one row per (stage, level)."""
+        return pd.DataFrame(self.levels, columns=['stage', 'level', 'candidates', 'pruned',
+                                                  'frequent', 'seconds', 'peak_kb'])
+
+    def close(self):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
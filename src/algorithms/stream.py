@@ -0,0 +1,96 @@
+from collections import deque
+from itertools import combinations
+
+from algorithms.apriori import generate_rules
+from algorithms.limits import MiningResult
+
+
+class SlidingWindowMiner:
+    """
+    Frequent itemsets and rules over a sliding window of a transaction stream.
+    The window is count-based (window_size transactions) and/or time-based
+    (window: duration, same type as timestamp differences, e.g. a timedelta).
+    Exact counts of every itemset up to max_len items are kept incrementally:
+    an insert adds the basket's subsets and an expiry removes them, so a
+    query only filters the counts instead of re-mining the window.
+    A basket has 2**len subsets, so max_len is required; longer itemsets are
+    not counted, and the result is marked truncated while the window holds
+    a basket longer than max_len.
+    """
+
+    def __init__(self, min_support=0.2, min_conf=0.5, window_size=None, window=None, max_len=3):
+        if window_size is None and window is None:
+            raise ValueError("Set window_size and/or window")
+        if not isinstance(max_len, int) or max_len < 1:
+            raise ValueError(f"max_len must be a positive integer, got {max_len!r}")
+        self.min_support = min_support
+        self.min_conf = min_conf
+        self.window_size = window_size
+        self.window = window
+        self.max_len = max_len
+        self._window = deque()  # (timestamp, sorted item tuple)
+        self.counts = {}
+        self._n_long = 0  # baskets in the window longer than max_len
+        self._cache = None
+
+    def __len__(self):
+        return len(self._window)
+
+    def insert(self, items, timestamp=None):
+        """Add one basket (timestamps must be non-decreasing) and expire old ones."""
+        t = tuple(sorted(set(items)))
+        self._window.append((timestamp, t))
+        self._apply(t, 1)
+        if self.window_size is not None:
+            while len(self._window) > self.window_size:
+                self._apply(self._window.popleft()[1], -1)
+        if self.window is not None and timestamp is not None:
+            self.expire(timestamp)
+
+    def insert_many(self, transactions, timestamps=None):
+        if timestamps is None:
+            timestamps = [None] * len(transactions)
+        for items, ts in zip(transactions, timestamps):
+            self.insert(items, ts)
+
+    def expire(self, now):
+        """Drop baskets older than `window` relative to `now`."""
+        if self.window is None:
+            return
+        while self._window and self._window[0][0] is not None \
+                and now - self._window[0][0] > self.window:
+            self._apply(self._window.popleft()[1], -1)
+
+    def frequent_itemsets(self):
+        """
+        Current frequent itemsets as {k: {frozenset(items): support}}
+        (a MiningResult, truncated by max_len if the window has longer baskets).
+        """
+        if self._cache is None:
+            n_tx = len(self._window)
+            by_k = {}
+            for iset, cnt in self.counts.items():
+                if cnt / n_tx >= self.min_support:
+                    by_k.setdefault(len(iset), {})[frozenset(iset)] = cnt / n_tx
+            capped = self._n_long > 0
+            self._cache = MiningResult(by_k, truncated=capped,
+                                       reason="max_len" if capped else None)
+        return self._cache
+
+    def rules(self, **kwargs):
+        """Rules from the current frequent itemsets (kwargs go to generate_rules)."""
+        return generate_rules(self.frequent_itemsets(), min_conf=self.min_conf,
+                              n_tx=len(self._window), **kwargs)
+
+    def _apply(self, t, delta):
+        self._cache = None
+        counts = self.counts
+        if len(t) > self.max_len:
+            self._n_long += delta
+        for k in range(1, min(self.max_len, len(t)) + 1):
+            for c in combinations(t, k):
+                cnt = counts.get(c, 0) + delta
+                if cnt:
+                    counts[c] = cnt
+                else:
+                    del counts[c]
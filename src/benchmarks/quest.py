@@ -0,0 +1,81 @@
+import numpy as np
+
+# pattern picks per basket item before quest_transactions() gives up filling it
+MAX_PICKS = 20
+
+
+def quest_patterns(n_patterns, avg_pattern_len, n_items, correlation=0.5, rng=None):
+    """
+    Potentially frequent itemsets of the IBM Quest generator.
+    Pattern sizes are Poisson(avg_pattern_len); each pattern reuses an
+    exponentially distributed fraction (mean `correlation`) of the previous
+    pattern's items, and the rest are drawn at random. Each pattern has an
+    exponential weight (its chance of being picked) and a corruption level.
+    Returns (patterns, weights, corruption).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    patterns = []
+    prev = np.zeros(0, dtype=np.int64)
+    for _ in range(n_patterns):
+        size = min(max(1, rng.poisson(avg_pattern_len)), n_items)
+        n_reused = min(int(round(min(rng.exponential(correlation), 1.0) * size)), len(prev))
+        reused = rng.choice(prev, n_reused, replace=False) if n_reused else prev[:0]
+        pattern = set(reused.tolist())
+        while len(pattern) < size:
+            pattern.add(int(rng.integers(n_items)))
+        prev = np.fromiter(pattern, dtype=np.int64)
+        patterns.append(prev)
+    weights = rng.exponential(1.0, n_patterns)
+    weights /= weights.sum()
+    corruption = np.clip(rng.normal(0.5, 0.1, n_patterns), 0.0, 1.0)
+    return patterns, weights, corruption
+
+
+def quest_transactions(n_tx, avg_len=10, n_items=1000, avg_pattern_len=4, n_patterns=200,
+                       correlation=0.5, seed=None):
+    """
+    IBM Quest-style synthetic market baskets (Agrawal & Srikant, 1994).
+    Transaction sizes are Poisson(avg_len). Each basket is filled with
+    patterns picked by weight, every pattern losing items while a uniform
+    draw stays below its corruption level; a pattern that doesn't fit is
+    added anyway half of the time, otherwise kept for the next basket.
+    Sizes are capped at n_items, and a basket whose patterns can't reach
+    its size (they cover too few items) is cut short after MAX_PICKS per item.
+    Returns a list of sets of item names ("i0", "i1", ...).
+    """
+    rng = np.random.default_rng(seed)
+    patterns, weights, corruption = quest_patterns(
+        n_patterns, avg_pattern_len, n_items, correlation, rng
+    )
+    names = [f"i{i}" for i in range(n_items)]
+    # draw pattern ids in blocks instead of one rng call per pick
+    picks = iter(())
+    carried = None
+    transactions = []
+    for _ in range(n_tx):
+        size = min(max(1, rng.poisson(avg_len)), n_items)
+        basket = set()
+        for _ in range(MAX_PICKS * size):
+            if len(basket) >= size:
+                break
+            if carried is not None:
+                p, carried = carried, None
+            else:
+                p = next(picks, None)
+                if p is None:
+                    picks = iter(rng.choice(len(patterns), 4096, p=weights).tolist())
+                    p = next(picks)
+            items = patterns[p]
+            # corrupt: drop items while a uniform draw is below the level
+            n_drop = 0
+            while n_drop < len(items) and rng.random() < corruption[p]:
+                n_drop += 1
+            if n_drop:
+                items = rng.permutation(items)[n_drop:]
+            if len(basket) + len(items) > size and basket:
+                if rng.random() < 0.5:
+                    carried = p
+                    break
+            basket.update(items.tolist())
+        transactions.append({names[i] for i in basket})
+    return transactions
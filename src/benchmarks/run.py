@@ -0,0 +1,154 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from algorithms.apriori import generate_rules
+from algorithms.miners import MINERS
+from benchmarks.quest import quest_transactions
+
+
+def measure(fn, repeat=1):
+    """
+    Best wall time (s) of `repeat` plain runs, plus the tracemalloc peak (MB)
+    of one extra traced run, so tracing overhead doesn't skew the timing.
+    Returns (result, wall_s, peak_mb).
+    """
+    wall = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        wall = min(wall, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, wall, peak / 2**20
+
+
+def run_benchmarks(sizes=(1_000, 10_000), supports=(0.05, 0.02, 0.01), min_conf=0.5,
+                   miners=("apriori", "eclat"), avg_len=10, n_items=1000,
+                   avg_pattern_len=4, n_patterns=200, seed=0, repeat=1):
+    """
+    Mine and generate rules for every (size, support, miner) in the grid.
+    Each size gets its own Quest dataset from the same seed.
+    Returns a list of result dicts, one per grid point.
+    """
+    results = []
+    for n_tx in sizes:
+        transactions = quest_transactions(n_tx, avg_len=avg_len, n_items=n_items,
+                                          avg_pattern_len=avg_pattern_len,
+                                          n_patterns=n_patterns, seed=seed)
+        for min_support in supports:
+            for name in miners:
+                miner = MINERS[name]
+                freq, mine_s, mine_mb = measure(
+                    lambda: miner(transactions, min_support=min_support), repeat)
+                rules, rules_s, rules_mb = measure(
+                    lambda: generate_rules(freq, min_conf=min_conf, n_tx=n_tx), repeat)
+                results.append({
+                    'miner': name,
+                    'n_tx': n_tx,
+                    'min_support': min_support,
+                    'min_conf': min_conf,
+                    'mine_s': mine_s,
+                    'mine_peak_mb': mine_mb,
+                    'rules_s': rules_s,
+                    'rules_peak_mb': rules_mb,
+                    'n_itemsets': sum(len(m) for m in freq.values()),
+                    'max_len': max(freq, default=0),
+                    'n_rules': len(rules)
+                })
+                print(f"{name:>9} n_tx={n_tx:<8} min_support={min_support:<6} "
+                      f"mine {mine_s:8.3f}s {mine_mb:8.1f}MB  "
+                      f"rules {rules_s:8.3f}s  itemsets={results[-1]['n_itemsets']} "
+                      f"rules={len(rules)}", flush=True)
+    return results
+
+
+def environment():
+    """Commit and interpreter details stored with every result file."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform()
+    }
+
+
+def compare(old_path, new_path):
+    """Print new/old time ratios for the grid points present in both files."""
+    def load(path):
+        with open(path) as f:
+            data = json.load(f)
+        return {(r['miner'], r['n_tx'], r['min_support'], r['min_conf']): r
+                for r in data['results']}, data['environment'].get('commit')
+
+    old, old_commit = load(old_path)
+    new, new_commit = load(new_path)
+    print(f"old: {old_commit}  new: {new_commit}  (ratio < 1 is faster)")
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        flag = "" if (o['n_itemsets'], o['n_rules']) == (n['n_itemsets'], n['n_rules']) \
+            else "  COUNTS DIFFER"
+        print(f"{key[0]:>9} n_tx={key[1]:<8} min_support={key[2]:<6} "
+              f"mine x{n['mine_s'] / o['mine_s']:.2f}  "
+              f"rules x{n['rules_s'] / max(o['rules_s'], 1e-9):.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the frequent itemset miners.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--supports", type=float, nargs="+", default=[0.05, 0.02, 0.01])
+    parser.add_argument("--min-conf", type=float, default=0.5)
+    parser.add_argument("--miners", nargs="+", choices=sorted(MINERS),
+                        default=["apriori", "eclat"])
+    parser.add_argument("--avg-len", type=float, default=10)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--pattern-len", type=float, default=4)
+    parser.add_argument("--patterns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    params = {
+        'sizes': args.sizes, 'supports': args.supports, 'min_conf': args.min_conf,
+        'miners': args.miners, 'avg_len': args.avg_len, 'n_items': args.items,
+        'avg_pattern_len': args.pattern_len, 'n_patterns': args.patterns,
+        'seed': args.seed, 'repeat': args.repeat
+    }
+    results = run_benchmarks(
+        sizes=args.sizes, supports=args.supports, min_conf=args.min_conf,
+        miners=args.miners, avg_len=args.avg_len, n_items=args.items,
+        avg_pattern_len=args.pattern_len, n_patterns=args.patterns,
+        seed=args.seed, repeat=args.repeat
+    )
+    with open(args.out, "w") as f:
+        json.dump({'environment': environment(), 'params': params, 'results': results},
+                  f, indent=2)
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
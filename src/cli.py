@@ -0,0 +1,141 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from algorithms.apriori import generate_rules
+from algorithms.miners import MINERS
+from algorithms.stats import MiningStats
+from preprocessing.cleaner import preprocess_transactions, safe_read_csv
+
+RULE_COLUMNS = ['antecedent', 'consequent', 'support', 'confidence', 'lift',
+                'leverage', 'conviction', 'jaccard']
+
+
+def require_parquet():
+    """Parquet I/O goes through pyarrow, which is an optional dependency."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "Parquet input/output needs the optional dependency pyarrow "
+            "(pip install pyarrow), or use --format csv and a CSV input."
+        ) from None
+
+
+def read_transactions(path):
+    """
+    Transactions from a CSV or Parquet file with an 'items' column: a
+    comma-separated string per basket, or (Parquet) a list of item names.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        require_parquet()
+        df = pd.read_parquet(path)
+    else:
+        df = safe_read_csv(str(path))
+        if df.empty:
+            raise FileNotFoundError(f"Could not read transactions from {path}")
+    if 'items' not in df.columns:
+        raise ValueError(f"{path} has no 'items' column")
+    # only the basket column: the cleaner would otherwise pick the last column
+    return df[['items']]
+
+
+def itemset_frame(freq_dict):
+    """Frequent itemsets as a table: items (sorted list), size, support."""
+    rows = [(sorted(iset), k, sup) for k, m in sorted(freq_dict.items()) for iset, sup in m.items()]
+    df = pd.DataFrame(rows, columns=['items', 'size', 'support'])
+    return df.sort_values(['size', 'support'], ascending=[True, False], ignore_index=True)
+
+
+def write_table(df, path, fmt):
+    """Write df as Parquet, or as CSV with list columns joined by ', '."""
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = [", ".join(x) if isinstance(x, (list, tuple)) else x for x in df[col]]
+        df.to_csv(path, index=False)
+
+
+def run(args):
+    if args.format == "parquet":
+        # fail before mining, not after
+        require_parquet()
+    raw = read_transactions(args.input)
+    products = safe_read_csv(args.products) if args.products else pd.DataFrame()
+    store, report = preprocess_transactions(raw, products, as_store=True, vectorized=True)
+    log(args, f"{report['after_valid_tx']} valid transactions, "
+              f"{report['unique_products']} products")
+
+    limits = {
+        'max_len': args.max_len,
+        'max_candidates': args.max_candidates,
+        'time_budget': args.time_budget,
+        'memory_budget': args.memory_budget * 2**20 if args.memory_budget else None
+    }
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".parquet" if args.format == "parquet" else ".csv"
+    for name in args.algorithms:
+        callback = (lambda row: log(args, f"  {row['stage']} level {row['level']}: "
+                                          f"{row['candidates']} candidates, "
+                                          f"{row['frequent']} kept"))
+        stats = MiningStats(callback=callback if args.verbose else None)
+        t0 = time.perf_counter()
+        miner_kwargs = {} if name == "fpgrowth" else dict(limits, stats=stats)
+        freq = MINERS[name](store, min_support=args.min_support, **miner_kwargs)
+        rules = generate_rules(freq, min_conf=args.min_conf, n_tx=len(store),
+                               columnar=True, stats=stats)
+        elapsed = time.perf_counter() - t0
+
+        itemsets = itemset_frame(freq)
+        rules = rules[RULE_COLUMNS].copy()
+        rules['antecedent'] = rules['antecedent'].map(list)
+        rules['consequent'] = rules['consequent'].map(list)
+        write_table(itemsets, out_dir / f"{name}_itemsets{suffix}", args.format)
+        write_table(rules, out_dir / f"{name}_rules{suffix}", args.format)
+        log(args, f"{name}: {len(itemsets)} itemsets, {len(rules)} rules "
+                  f"in {elapsed:.2f}s -> {out_dir}", force=True)
+        if getattr(freq, 'truncated', False):
+            log(args, f"{name}: results truncated by {freq.reason}, complete up to "
+                      f"itemsets of size {freq.level_reached}", force=True)
+
+
+def log(args, msg, force=False):
+    if force or args.verbose:
+        print(msg, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mine frequent itemsets and association rules without the UI."
+    )
+    parser.add_argument("input", help="transactions file (.csv or .parquet) with an 'items' column")
+    parser.add_argument("--products", default=None,
+                        help="products CSV used to drop invalid items (default: no validation)")
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(MINERS), default=["apriori"])
+    parser.add_argument("--min-support", type=float, default=0.2)
+    parser.add_argument("--min-conf", type=float, default=0.5)
+    parser.add_argument("--out-dir", default="results")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--max-len", type=int, default=None,
+                        help="largest itemset size (apriori/eclat)")
+    parser.add_argument("--max-candidates", type=int, default=None)
+    parser.add_argument("--time-budget", type=float, default=None, help="seconds per engine")
+    parser.add_argument("--memory-budget", type=int, default=None, help="MB per engine")
+    parser.add_argument("-v", "--verbose", action="store_true", help="report every level")
+    args = parser.parse_args(argv)
+    try:
+        run(args)
+    except (ImportError, FileNotFoundError, ValueError) as e:
+        parser.exit(1, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
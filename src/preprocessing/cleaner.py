@@ -1,7 +1,18 @@
+import hashlib
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from itertools import chain
+import numpy as np
 import pandas as pd
 
+from preprocessing.store import (TransactionStore, StoreWriter, open_store, save_store,
+                                 read_meta, file_hash)
+
+# bump when cleaning changes, so caches written by older code are rebuilt
+CACHE_VERSION = 1
+
 def normalize_item(x: str) -> str:
     """Normalize product names (trim, lowercase, collapse spaces)."""
     if not isinstance(x, str):
@@ -18,8 +29,126 @@ def safe_read_csv(path_str: str) -> pd.DataFrame:
     except Exception:
         return pd.DataFrame()
 
-def preprocess_transactions(df: pd.DataFrame, products_df: pd.DataFrame):
-    """Perform required cleaning and return cleaned transactions + report dict."""
+def is_item_list(raw) -> bool:
+    """True for a basket that is already a list of item names (e.g. a Parquet list column)."""
+    return not isinstance(raw, str) and hasattr(raw, "__iter__")
+
+def split_basket(raw) -> list:
+    """
+    Split a raw basket string on commas (or spaces if it has none) and normalize
+    each token. A basket that is already a list of names is only normalized.
+    """
+    if is_item_list(raw):
+        parts = (normalize_item(str(x)) for x in raw)
+    else:
+        sep = ',' if "," in raw else ' '
+        parts = (normalize_item(x) for x in raw.split(sep))
+    return [x for x in parts if x]
+
+def dedup_basket(items: list):
+    """Drop repeated items keeping first occurrence. Returns (items, duplicates removed)."""
+    deduped = list(dict.fromkeys(items))
+    return deduped, len(items) - len(deduped)
+
+def load_valid_names(products_df: pd.DataFrame):
+    """Normalized product whitelist from products_df, or None if there is none."""
+    if products_df is None or products_df.empty:
+        return None
+    # normalize column names
+    cols = [c.lower().strip() for c in products_df.columns]
+    products_df.columns = cols
+
+    # Prefer 'product_name', then 'name', then last column
+    if 'product_name' in cols:
+        name_col = 'product_name'
+    elif 'name' in cols:
+        name_col = 'name'
+    else:
+        name_col = cols[-1] if cols else None
+
+    if name_col is None:
+        return None
+    return set(normalize_item(x) for x in products_df[name_col].astype(str))
+
+def _preprocess_vectorized(items: pd.Series, valid_names, as_store: bool):
+    """Vectorized cleaning with pandas string methods + explode/groupby (same output as the loop)."""
+    items = items.reset_index(drop=True)
+    listed = items.map(is_item_list)
+    raw = items.where(~listed, "").astype(str).fillna("")
+    before_total = len(raw)
+
+    # baskets without a comma are space separated: turn their spaces into commas
+    has_comma = raw.str.contains(",", regex=False)
+    raw = raw.where(has_comma, raw.str.replace(" ", ",", regex=False))
+    # list-valued baskets keep their names whole (commas inside a name are not split)
+    parts = raw.str.split(",")
+    parts[listed] = items[listed].map(lambda x: [str(i) for i in x] or [""])
+    tokens = parts.explode()
+
+    # normalize: trim, lowercase, collapse whitespace. Baskets repeat the same
+    # few tokens, so normalize each distinct token once and map back by code
+    codes, uniques = pd.factorize(tokens)
+    uniques = (pd.Series(uniques, dtype=object).str.strip()
+                                               .str.lower()
+                                               .str.replace(r"\s+", " ", regex=True))
+    frame = pd.DataFrame({'tx': tokens.index, 'item': uniques.to_numpy(dtype=object)[codes]})
+    frame = frame[frame['item'] != ""]
+
+    # remove empties
+    empty_count = before_total - frame['tx'].nunique()
+
+    # remove duplicates within each transaction
+    dup_mask = frame.duplicated(['tx', 'item'])
+    dup_instances = int(dup_mask.sum())
+    frame = frame[~dup_mask]
+
+    # single-item handling: remove
+    sizes = np.bincount(frame['tx'].to_numpy(), minlength=before_total)
+    single_count = int((sizes == 1).sum())
+    frame = frame[sizes[frame['tx'].to_numpy()] > 1]
+
+    # invalid product handling
+    invalid_instances = 0
+    if valid_names is not None:
+        valid_mask = frame['item'].isin(valid_names)
+        invalid_instances = int((~valid_mask).sum())
+        frame = frame[valid_mask]
+        sizes = np.bincount(frame['tx'].to_numpy(), minlength=before_total)
+        frame = frame[sizes[frame['tx'].to_numpy()] > 1]
+
+    # rows are still in transaction order, so each basket is a contiguous run
+    lengths = np.bincount(frame['tx'].to_numpy(), minlength=before_total)
+    lengths = lengths[lengths > 0]
+    indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+
+    report = {
+        'before_total_tx': before_total,
+        'empty_tx_removed': empty_count,
+        'single_item_tx_removed': single_count,
+        'duplicate_items_removed': dup_instances,
+        'invalid_items_removed': invalid_instances,
+        'after_valid_tx': len(lengths),
+        'total_items': len(frame),
+        'unique_products': int(frame['item'].nunique()),
+    }
+
+    if as_store:
+        codes, vocab = pd.factorize(frame['item'], sort=True)
+        return TransactionStore(list(vocab), indptr, codes), report
+    items = frame['item'].to_numpy(dtype=object)
+    cleaned = [items[a:b].tolist() for a, b in zip(indptr[:-1], indptr[1:])]
+    return cleaned, report
+
+def preprocess_transactions(df: pd.DataFrame, products_df: pd.DataFrame, as_store: bool = False,
+                            vectorized: bool = False):
+    """
+    Perform required cleaning and return cleaned transactions + report dict.
+    With as_store=True the transactions come back as a compact TransactionStore
+    (item vocabulary + CSR int32 arrays) instead of a list of lists.
+    With vectorized=True the cleaning runs on pandas string methods instead of
+    Python loops; results and report counts are the same.
+    """
     if df.shape[1] == 1:
         df = df.copy()
         df.columns = ['items']
@@ -28,16 +157,13 @@ def preprocess_transactions(df: pd.DataFrame, products_df: pd.DataFrame):
         items_col = df.columns[-1]
         df = df[[items_col]].rename(columns={items_col: 'items'})
 
+    if vectorized:
+        return _preprocess_vectorized(df['items'], load_valid_names(products_df), as_store)
+
     before_total = len(df)
 
     # split comma separated into lists
-    tx_lists = []
-    for raw in df['items'].astype(str).fillna(""):
-        if "," in raw:
-            tx_lists.append([normalize_item(x) for x in raw.split(',') if normalize_item(x)])
-        else:
-            parts = [normalize_item(x) for x in raw.split(' ') if normalize_item(x)]
-            tx_lists.append(parts)
+    tx_lists = [split_basket(raw if is_item_list(raw) else str(raw)) for raw in df['items']]
 
     # remove empties
     empty_count = sum(1 for t in tx_lists if len(t) == 0)
@@ -47,12 +173,8 @@ def preprocess_transactions(df: pd.DataFrame, products_df: pd.DataFrame):
     dup_instances = 0
     deduped = []
     for t in tx_lists:
-        seen = []
-        for it in t:
-            if it not in seen:
-                seen.append(it)
-            else:
-                dup_instances += 1
+        seen, dups = dedup_basket(t)
+        dup_instances += dups
         deduped.append(seen)
 
     # single-item handling: remove
@@ -61,24 +183,7 @@ def preprocess_transactions(df: pd.DataFrame, products_df: pd.DataFrame):
 
     # invalid product handling using products_df (if provided)
     invalid_instances = 0
-    valid_names = None
-    if products_df is not None and not products_df.empty:
-        # normalize column names
-        cols = [c.lower().strip() for c in products_df.columns]
-        products_df.columns = cols
-
-        # Prefer 'product_name', then 'name', then last column
-        if 'product_name' in cols:
-            name_col = 'product_name'
-        elif 'name' in cols:
-            name_col = 'name'
-        else:
-            name_col = cols[-1] if cols else None
-
-        if name_col is not None:
-            valid_names = set(
-                normalize_item(x) for x in products_df[name_col].astype(str)
-            )
+    valid_names = load_valid_names(products_df)
 
     cleaned = []
     for t in deduped:
@@ -104,4 +209,127 @@ def preprocess_transactions(df: pd.DataFrame, products_df: pd.DataFrame):
         'total_items': total_items,
         'unique_products': unique_products,
     }
+    if as_store:
+        return TransactionStore.from_transactions(cleaned), report
     return cleaned, report
+
+def preprocess_transactions_stream(path, products_df: pd.DataFrame, out_path,
+                                   chunksize: int = 100_000):
+    """
+    Streaming variant of preprocess_transactions() for files larger than RAM.
+    Reads the CSV in chunks and normalizes, dedups, filters and validates each
+    basket in one pass, appending the kept baskets to an encoded transaction
+    file at out_path. Report counts match preprocess_transactions().
+    Returns (memory-mapped TransactionStore, report dict).
+    """
+    valid_names = load_valid_names(products_df)
+    # with a whitelist the vocabulary is fixed up front, otherwise it grows
+    index = {} if valid_names is None else {
+        name: i for i, name in enumerate(sorted(valid_names))
+    }
+    counts = dict.fromkeys([
+        'before_total_tx', 'empty_tx_removed', 'single_item_tx_removed',
+        'duplicate_items_removed', 'invalid_items_removed', 'after_valid_tx',
+        'total_items',
+    ], 0)
+    used_ids = set()
+
+    writer = StoreWriter(out_path, buffer_rows=chunksize)
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        # heuristics: use last column as items column
+        counts['before_total_tx'] += len(chunk)
+        for raw in chunk[chunk.columns[-1]].astype(str).fillna(""):
+            t = split_basket(raw)
+            if not t:
+                counts['empty_tx_removed'] += 1
+                continue
+            t, dups = dedup_basket(t)
+            counts['duplicate_items_removed'] += dups
+            if len(t) == 1:
+                counts['single_item_tx_removed'] += 1
+                continue
+            if valid_names is not None:
+                keep = [it for it in t if it in valid_names]
+                counts['invalid_items_removed'] += len(t) - len(keep)
+                if len(keep) <= 1:
+                    continue
+                t = keep
+            ids = [index.setdefault(it, len(index)) for it in t]
+            used_ids.update(ids)
+            counts['after_valid_tx'] += 1
+            counts['total_items'] += len(ids)
+            writer.append(ids)
+
+    report = dict(counts, unique_products=len(used_ids))
+    writer.close(list(index), report)
+    return open_store(out_path)
+
+
+def _cache_key(tx_path, products_path):
+    """What a cached cleaned dataset depends on: both input files and the cleaning code."""
+    return {
+        'source_hash': file_hash(tx_path),
+        'products_hash': file_hash(products_path),
+        'cache_version': CACHE_VERSION,
+    }
+
+
+def _cache_path(tx_path, cache_dir):
+    """One cache entry per source file, replaced when it goes stale."""
+    name = hashlib.sha1(str(Path(tx_path).resolve()).encode()).hexdigest()[:16]
+    return Path(cache_dir) / name
+
+
+def open_cached_transactions(tx_path, products_path, cache_dir):
+    """
+    Memory-mapped (store, report) of the cleaned transactions cached in
+    cache_dir by load_cleaned(), or None if there is no cache for the
+    current contents of tx_path and products_path.
+    """
+    return _open_cache(_cache_path(tx_path, cache_dir), _cache_key(tx_path, products_path))
+
+
+def _open_cache(path, key):
+    if key['source_hash'] is None:
+        return None
+    meta = read_meta(path)
+    if meta is None or any(meta.get(k) != v for k, v in key.items()):
+        return None
+    return open_store(path, mmap=True)
+
+
+def load_cleaned(tx_path, products_path, cache_dir):
+    """
+    Cleaned transactions of the CSV at tx_path, validated against the
+    products CSV at products_path, as a memory-mapped (store, report).
+    The first call cleans the CSV and writes an encoded transaction file
+    under cache_dir; later calls (from any session or process) map that
+    file instead, until either CSV changes.
+    """
+    final = _cache_path(tx_path, cache_dir)
+    key = _cache_key(tx_path, products_path)
+    cached = _open_cache(final, key)
+    if cached is not None:
+        return cached
+
+    df = safe_read_csv(tx_path)
+    if df.empty:
+        raise FileNotFoundError(f"Could not read transactions from {tx_path}")
+    store, report = preprocess_transactions(df, safe_read_csv(products_path),
+                                            as_store=True, vectorized=True)
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # write to a private directory and rename it into place, so concurrent
+    # readers never see a half-written cache
+    tmp = Path(tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-"))
+    save_store(store, tmp, report, extra=key)
+    if final.exists():
+        shutil.rmtree(final, ignore_errors=True)
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        # another process won the race (or still has the old cache open)
+        shutil.rmtree(tmp, ignore_errors=True)
+        return store, report
+    return open_store(final, mmap=True)
@@ -0,0 +1,207 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from algorithms.bitmap import pack_bits
+
+
+class TransactionStore:
+    """
+    Compact transaction store: an item vocabulary plus CSR-style arrays.
+    Transaction i holds the item ids indices[indptr[i]:indptr[i + 1]],
+    and items[id] is the product name for an id.
+    """
+
+    def __init__(self, items, indptr, indices):
+        self.items = list(items)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+
+    @classmethod
+    def from_transactions(cls, transactions, items=None):
+        """Encode an iterable of item collections. Vocabulary defaults to sorted names."""
+        transactions = [list(dict.fromkeys(t)) for t in transactions]
+        if items is None:
+            items = sorted({it for t in transactions for it in t})
+        index = {it: i for i, it in enumerate(items)}
+        lengths = [len(t) for t in transactions]
+        indptr = np.zeros(len(transactions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            (index[it] for t in transactions for it in t),
+            dtype=np.int32, count=int(indptr[-1])
+        )
+        return cls(items, indptr, indices)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_items(self):
+        return len(self.items)
+
+    def row(self, i):
+        """Item ids of transaction i."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def rows(self):
+        """All transactions as lists of integer item ids."""
+        return [r.tolist() for r in np.split(self.indices, self.indptr[1:-1])] if len(self) else []
+
+    def slice(self, start, stop):
+        """
+        Transactions start..stop-1 as a new in-memory store with the same
+        vocabulary. Only that part of memory-mapped arrays is read.
+        """
+        indptr = np.array(self.indptr[start:stop + 1], dtype=np.int64)
+        indices = np.array(self.indices[indptr[0]:indptr[-1]], dtype=np.int32)
+        return TransactionStore(self.items, indptr - indptr[0], indices)
+
+    def take(self, ids):
+        """Transactions with the given row ids as a new in-memory store (same vocabulary)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        starts, stops = self.indptr[ids], self.indptr[ids + 1]
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(stops - starts, out=indptr[1:])
+        if len(ids) and indptr[-1]:
+            # positions of every kept item id in self.indices
+            pos = np.repeat(starts - indptr[:-1], stops - starts) + np.arange(indptr[-1])
+            indices = np.asarray(self.indices[pos], dtype=np.int32)
+        else:
+            indices = np.zeros(0, dtype=np.int32)
+        return TransactionStore(self.items, indptr, indices)
+
+    def transaction(self, i):
+        """Transaction i decoded to product names."""
+        return [self.items[j] for j in self.row(i)]
+
+    def decode(self, ids):
+        """Map an iterable of item ids to a frozenset of product names."""
+        return frozenset(self.items[i] for i in ids)
+
+    def decode_itemsets(self, freq_dict):
+        """Decode {k: {frozenset(ids): support}} to product names."""
+        return {k: {self.decode(iset): sup for iset, sup in m.items()}
+                for k, m in freq_dict.items()}
+
+    def item_counts(self):
+        """Number of transactions containing each item id."""
+        return np.bincount(self.indices, minlength=self.n_items)
+
+    def tid_lists(self):
+        """Vertical layout: sorted int32 transaction ids for every item id."""
+        tids = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind="stable")
+        bounds = np.zeros(self.n_items + 1, dtype=np.int64)
+        np.cumsum(self.item_counts(), out=bounds[1:])
+        sorted_tids = tids[order]
+        return [sorted_tids[bounds[i]:bounds[i + 1]] for i in range(self.n_items)]
+
+    def to_bitmap(self):
+        """Packed bit matrix (items x transactions) with row i for item id i."""
+        tids = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return pack_bits(self.indices, tids, self.n_items, len(self))
+
+
+# on-disk encoded transaction file: a directory holding the raw CSR arrays
+# plus a JSON file with the vocabulary and the preprocessing report
+INDICES_FILE = "indices.i32"
+INDPTR_FILE = "indptr.i64"
+META_FILE = "meta.json"
+
+
+class StoreWriter:
+    """
+    Incrementally write transactions (lists of item ids) to an encoded
+    transaction file, buffering at most `buffer_rows` transactions in memory.
+    """
+
+    def __init__(self, path, buffer_rows=100_000):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.buffer_rows = buffer_rows
+        self._indices = open(self.path / INDICES_FILE, "wb")
+        self._indptr = open(self.path / INDPTR_FILE, "wb")
+        self._pending_ids = []
+        self._pending_ptr = [0]
+        self._offset = 0
+        self.n_tx = 0
+
+    def append(self, ids):
+        self._pending_ids.extend(ids)
+        self._offset += len(ids)
+        self._pending_ptr.append(self._offset)
+        self.n_tx += 1
+        if len(self._pending_ptr) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        np.asarray(self._pending_ids, dtype=np.int32).tofile(self._indices)
+        np.asarray(self._pending_ptr, dtype=np.int64).tofile(self._indptr)
+        self._pending_ids = []
+        self._pending_ptr = []
+
+    def close(self, items, report=None):
+        """Flush remaining rows and write the vocabulary/report metadata."""
+        self.flush()
+        self._indices.close()
+        self._indptr.close()
+        meta = {"items": list(items), "n_tx": self.n_tx, "report": report}
+        (self.path / META_FILE).write_text(json.dumps(meta))
+
+
+def save_store(store, path, report=None, extra=None):
+    """
+    Write a TransactionStore (and optional report) as an encoded transaction file.
+    extra: additional JSON-serializable metadata (see read_meta()).
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    np.asarray(store.indices, dtype=np.int32).tofile(path / INDICES_FILE)
+    np.asarray(store.indptr, dtype=np.int64).tofile(path / INDPTR_FILE)
+    meta = dict(extra or {}, items=store.items, n_tx=len(store), report=report)
+    # the metadata goes last, so a file with metadata is complete
+    (path / META_FILE).write_text(json.dumps(meta, default=int))
+
+
+def read_meta(path):
+    """Metadata dict of an encoded transaction file, or None if it is missing or unreadable."""
+    try:
+        return json.loads((Path(path) / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-1 hex digest of a file's contents, or None if it doesn't exist."""
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def open_store(path, mmap=True):
+    """
+    Open an encoded transaction file. Returns (store, report).
+    With mmap=True the CSR arrays are memory-mapped instead of read into RAM.
+    """
+    path = Path(path)
+    meta = json.loads((path / META_FILE).read_text())
+
+    def load(name, dtype):
+        f = path / name
+        if f.stat().st_size == 0:
+            return np.zeros(0, dtype=dtype)
+        if mmap:
+            return np.memmap(f, dtype=dtype, mode="r")
+        return np.fromfile(f, dtype=dtype)
+
+    store = TransactionStore(meta["items"], load(INDPTR_FILE, np.int64),
+                             load(INDICES_FILE, np.int32))
+    return store, meta["report"]
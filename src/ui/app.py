@@ -1,19 +1,36 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 
 import pandas as pd
 import streamlit as st
 
-from algorithms.apriori import apriori, generate_rules
-from algorithms.eclat import eclat
+from algorithms.apriori import generate_rules
+from algorithms.eclat import top_k_itemsets
+from algorithms.fpgrowth import fpgrowth
+from algorithms.miners import MINERS
+from algorithms.rule_index import RuleIndex
+from algorithms.sampling import preview, verify_in_background
+from algorithms.stats import MiningCancelled, MiningStats
+from algorithms.cache import MiningCache, fingerprint
 from preprocessing.cleaner import (
     normalize_item,
     safe_read_csv,
     preprocess_transactions,
+    open_cached_transactions,
+    load_cleaned,
 )
 
+LABELS = {'apriori': "Apriori", 'eclat': "Eclat", 'fpgrowth': "FP-Growth"}
+
+# background mining; module level so running jobs survive Streamlit reruns
+EXECUTOR = ThreadPoolExecutor(max_workers=len(MINERS))
+SERIAL_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
 TX_PATH = "./data/sample_transactions.csv"
 PROD_PATH = "./data/products.csv"
+# cleaned copy of TX_PATH, shared by all sessions until either CSV changes
+CACHE_DIR = "./data/.cache"
 
 def set_style():
     st.markdown("""
@@ -88,6 +105,51 @@ def load_products():
     )
     return prod_df_raw, product_names
 
+def rule_columns(rules):
+    """Rule table without the internal itemset id columns, for display."""
+    return rules.drop(columns=['antecedent_id', 'consequent_id', 'itemset_id'])
+
+def level_breakdown(levels):
+    """Per-level candidates/pruned/frequent, time and memory of the last run."""
+    with st.expander("Per-level breakdown"):
+        if levels.empty:
+            st.caption("Served from cache, nothing was mined.")
+        else:
+            st.dataframe(levels, use_container_width=True, hide_index=True)
+
+def mine_job(miner, tx, min_support, min_conf, cache, fp, stats, limits=None):
+    """Frequent itemsets, rules and rule index for one engine (runs on an executor)."""
+    t0 = time.perf_counter()
+    # fpgrowth has no per-level stats or limits; its rule generation still reports
+    miner_stats = stats if miner is not fpgrowth else None
+    limits = limits if miner is not fpgrowth else {}
+    try:
+        freq = cache.frequent(miner, tx, min_support, fp=fp, stats=miner_stats, **limits)
+        if getattr(freq, 'truncated', False):
+            # partial results aren't cached, so don't let the cache mine again
+            rules = generate_rules(freq, min_conf=min_conf, n_tx=len(tx), columnar=True,
+                                   stats=stats)
+        else:
+            rules = cache.rules(miner, tx, min_support, min_conf, fp=fp, miner_kwargs=limits,
+                                columnar=True, stats=stats)
+    finally:
+        stats.close()
+    return {
+        'freq': freq,
+        'rules': rules,
+        'index': RuleIndex(rules),
+        'runtime_ms': (time.perf_counter() - t0) * 1000,
+        'levels': stats.to_frame()
+    }
+
+def truncation_note(freq):
+    """Warn when a limit cut the run short (see algorithms.limits)."""
+    if getattr(freq, 'truncated', False):
+        st.warning(
+            f"Results truncated ({freq.reason.replace('_', ' ')}); "
+            f"complete up to itemsets of size {freq.level_reached}."
+        )
+
 def choose_transactions_source(uploaded_file):
     if uploaded_file is not None:
         try:
@@ -121,6 +183,19 @@ def run_app():
     st.sidebar.header("Mining Parameters")
     min_support = st.sidebar.slider("Minimum Support", 0.05, 0.9, 0.2, 0.05)
     min_conf = st.sidebar.slider("Minimum Confidence", 0.05, 0.95, 0.5, 0.05)
+    track_memory = st.sidebar.checkbox("Track memory per level (slower)", value=False)
+    with st.sidebar.expander("Limits (Apriori & Eclat, 0 = none)"):
+        max_len = st.number_input("Max itemset size", 0, 50, 0)
+        max_candidates = st.number_input("Max candidates", 0, 10**9, 0, step=10_000)
+        time_budget = st.number_input("Time budget (s)", 0.0, 3600.0, 0.0, step=5.0)
+        memory_budget_mb = st.number_input("Memory budget (MB)", 0, 10**6, 0, step=256)
+    limits = {
+        'max_len': int(max_len) or None,
+        'max_candidates': int(max_candidates) or None,
+        'time_budget': float(time_budget) or None,
+        'memory_budget': int(memory_budget_mb) * 2**20 or None
+    }
+    limits = {k: v for k, v in limits.items() if v is not None}
 
     # Session state
     if 'manual_txs' not in st.session_state:
@@ -128,8 +203,15 @@ def run_app():
     if 'cleaned' not in st.session_state:
         st.session_state.cleaned = None
         st.session_state.report = None
+        cached = open_cached_transactions(TX_PATH, PROD_PATH, CACHE_DIR) \
+            if uploaded_file is None else None
+        if cached is not None:
+            st.session_state.cleaned, st.session_state.report = cached
+            st.session_state.fingerprint = fingerprint(st.session_state.cleaned)
     if 'results' not in st.session_state:
         st.session_state.results = {}
+    if 'mining_cache' not in st.session_state:
+        st.session_state.mining_cache = MiningCache()
 
     # Choose tx source
     tx_df_raw = choose_transactions_source(uploaded_file)
@@ -176,8 +258,14 @@ def run_app():
 
     run_prep = st.button("Preprocess")
     if run_prep:
-        cleaned, report = preprocess_transactions(combined_df, prod_df_raw)
-        st.session_state.cleaned = [set(t) for t in cleaned]
+        if uploaded_file is None and not st.session_state.manual_txs:
+            cleaned, report = load_cleaned(TX_PATH, PROD_PATH, CACHE_DIR)
+        else:
+            cleaned, report = preprocess_transactions(
+                combined_df, prod_df_raw, as_store=True, vectorized=True
+            )
+        st.session_state.cleaned = cleaned
+        st.session_state.fingerprint = fingerprint(cleaned)
         st.session_state.report = report
 
     if st.session_state.cleaned is not None:
@@ -199,7 +287,8 @@ def run_app():
             )
 
         st.subheader("Cleaned Transactions")
-        sample = [' , '.join(sorted(t)) for t in st.session_state.cleaned[:25]]
+        store = st.session_state.cleaned
+        sample = [' , '.join(sorted(store.transaction(i))) for i in range(min(25, len(store)))]
         st.dataframe(
             pd.DataFrame({'transaction': sample}),
             use_container_width=True,
@@ -209,57 +298,159 @@ def run_app():
     st.divider()
 
     # ------------------------------
-    # 3) Run Mining (Apriori & Eclat)
-    st.subheader("Data Mine (Apriori & Eclat)")
+    # 3) Run Mining (Apriori, Eclat & FP-Growth)
+    st.subheader("Data Mine (Apriori, Eclat & FP-Growth)")
     run_mining = st.button("Analyze")
+    run_preview = st.button("Quick preview (sample)")
 
-    if run_mining:
+    if run_preview:
         if not st.session_state.cleaned:
             st.error("Please run preprocessing first (and ensure you have at least 2-item transactions).")
         else:
-            tx = [set(t) for t in st.session_state.cleaned]
-            # Apriori
-            t0 = time.perf_counter()
-            L_ap = apriori(tx, min_support=min_support)
-            rules_ap = generate_rules(L_ap, min_conf=min_conf, n_tx=len(tx))
-            t1 = time.perf_counter()
-            # Eclat
-            t2 = time.perf_counter()
-            L_ec = eclat(tx, min_support=min_support)
-            rules_ec = generate_rules(L_ec, min_conf=min_conf, n_tx=len(tx))
-            t3 = time.perf_counter()
-
-            st.session_state.results = {
-                'apriori': {
-                    'freq': L_ap,
-                    'rules': rules_ap,
-                    'runtime_ms': (t1 - t0) * 1000
-                },
-                'eclat': {
-                    'freq': L_ec,
-                    'rules': rules_ec,
-                    'runtime_ms': (t3 - t2) * 1000
-                },
-                'n_tx': len(tx)
+            tx = st.session_state.cleaned
+            # mine a sample now, check it against the full data in the background
+            result = preview(tx, min_support)
+            st.session_state.preview = {
+                'result': result,
+                'verification': verify_in_background(tx, result)
             }
 
+    if run_mining and not st.session_state.get('jobs'):
+        if not st.session_state.cleaned:
+            st.error("Please run preprocessing first (and ensure you have at least 2-item transactions).")
+        else:
+            tx = st.session_state.cleaned
+            cache = st.session_state.mining_cache
+            fp = st.session_state.fingerprint
+            # mining runs in the background so the page stays responsive and
+            # reruns don't restart it; memory tracing and the memory budget
+            # are process-wide, so with either on the engines run one after
+            # another. Results are cached by dataset fingerprint + thresholds:
+            # reruns with the same data only mine again when min_support
+            # drops below a cached run
+            serial = track_memory or 'memory_budget' in limits
+            executor = SERIAL_EXECUTOR if serial else EXECUTOR
+            jobs = {}
+            for name, miner in MINERS.items():
+                stats = MiningStats(track_memory=track_memory)
+                jobs[name] = {
+                    'stats': stats,
+                    'future': executor.submit(
+                        mine_job, miner, tx, min_support, min_conf, cache, fp, stats, limits
+                    )
+                }
+            st.session_state.jobs = jobs
+            st.session_state.jobs_n_tx = len(tx)
+
+    jobs = st.session_state.get('jobs')
+    if jobs:
+        if all(job['future'].done() for job in jobs.values()):
+            st.session_state.jobs = None
+            errors = {name: job['future'].exception() for name, job in jobs.items()}
+            if any(isinstance(e, MiningCancelled) for e in errors.values()):
+                st.warning("Mining cancelled.")
+            elif any(e is not None for e in errors.values()):
+                failed = next(e for e in errors.values() if e is not None)
+                st.error(f"Mining failed: {failed}")
+            else:
+                st.session_state.results = {
+                    name: job['future'].result() for name, job in jobs.items()
+                }
+                st.session_state.results['n_tx'] = st.session_state.jobs_n_tx
+        else:
+            n_done = sum(job['future'].done() for job in jobs.values())
+            st.progress(n_done / len(jobs), text=f"Mining... {n_done}/{len(jobs)} engines done")
+            for name, job in jobs.items():
+                levels = job['stats'].levels
+                if job['future'].done():
+                    status = "done"
+                elif levels:
+                    last = levels[-1]
+                    status = (f"{last['stage']} level {last['level']}: "
+                              f"{last['frequent']} kept of {last['candidates']}")
+                else:
+                    status = "running"
+                st.caption(f"{LABELS[name]}: {status}")
+            if st.button("Cancel"):
+                for job in jobs.values():
+                    job['stats'].cancel()
+
+    if st.session_state.get('preview'):
+        result = st.session_state.preview['result']
+        verification = st.session_state.preview['verification']
+        st.markdown("**Preview (sampled)**")
+        st.write(
+            f"{result['n_sample']} of {result['n_tx']} transactions, "
+            f"support ± {result['error'] * 100:.1f}% (95% confidence)"
+        )
+        preview_rows = [
+            {
+                'itemset': ", ".join(sorted(iset)),
+                'support_pct': sup * 100,
+                'low_pct': result['intervals'][iset][0] * 100,
+                'high_pct': result['intervals'][iset][1] * 100
+            }
+            for m in result['freq'].values() for iset, sup in m.items()
+        ]
+        preview_rows.sort(key=lambda r: r['support_pct'], reverse=True)
+        st.dataframe(pd.DataFrame(preview_rows), use_container_width=True, hide_index=True)
+        if verification.done():
+            checked = verification.result()
+            n_exact = sum(len(m) for m in checked['freq'].values())
+            if checked['complete']:
+                st.success(f"Verified on the full data: {n_exact} frequent itemsets.")
+            else:
+                st.warning(
+                    f"The sample missed {len(checked['missed'])} itemsets; "
+                    f"the full data has {n_exact} frequent itemsets."
+                )
+        else:
+            st.info("Verifying against the full data in the background...")
+
     if st.session_state.get('results'):
         res = st.session_state.results
-        c1, c2 = st.columns(2)
+        c1, c2, c3 = st.columns(3)
         with c1:
             st.markdown("**Apriori**")
             st.write(f"Runtime: {res['apriori']['runtime_ms']:.1f} ms")
             st.write(f"Rules generated: {len(res['apriori']['rules'])}")
+            truncation_note(res['apriori']['freq'])
+            level_breakdown(res['apriori']['levels'])
         with c2:
             st.markdown("**Eclat**")
             st.write(f"Runtime: {res['eclat']['runtime_ms']:.1f} ms")
             st.write(f"Rules generated: {len(res['eclat']['rules'])}")
+            truncation_note(res['eclat']['freq'])
+            level_breakdown(res['eclat']['levels'])
+        with c3:
+            st.markdown("**FP-Growth**")
+            st.write(f"Runtime: {res['fpgrowth']['runtime_ms']:.1f} ms")
+            st.write(f"Rules generated: {len(res['fpgrowth']['rules'])}")
+            level_breakdown(res['fpgrowth']['levels'])
 
         # Display rules (toggle technical)
         with st.expander("Show technical rules (Apriori)"):
-            st.dataframe(pd.DataFrame(res['apriori']['rules']), use_container_width=True)
+            st.dataframe(rule_columns(res['apriori']['rules']), use_container_width=True)
         with st.expander("Show technical rules (Eclat)"):
-            st.dataframe(pd.DataFrame(res['eclat']['rules']), use_container_width=True)
+            st.dataframe(rule_columns(res['eclat']['rules']), use_container_width=True)
+        with st.expander("Show technical rules (FP-Growth)"):
+            st.dataframe(rule_columns(res['fpgrowth']['rules']), use_container_width=True)
+        with st.expander("Top-K itemsets (no minimum support)"):
+            top_k = st.number_input("K", min_value=1, max_value=1000, value=20, step=1)
+            # mined on demand only: this script reruns on every widget change and poll
+            top_key = (st.session_state.fingerprint, int(top_k))
+            if st.button("Find top-K itemsets"):
+                st.session_state.top_itemsets = (
+                    top_key, top_k_itemsets(st.session_state.cleaned, int(top_k))
+                )
+            cached_top = st.session_state.get('top_itemsets')
+            if cached_top is not None and cached_top[0] == top_key:
+                top_rows = [
+                    {'itemset': ", ".join(sorted(iset)), 'size': k, 'support': sup}
+                    for k, m in cached_top[1].items() for iset, sup in m.items()
+                ]
+                top_rows.sort(key=lambda r: r['support'], reverse=True)
+                st.dataframe(pd.DataFrame(top_rows), use_container_width=True, hide_index=True)
 
         st.subheader("Query Recommendations")
         if res['apriori']['freq'] and res['apriori']['freq'].get(1, {}):
@@ -269,35 +460,11 @@ def run_app():
             all_items = product_names
         picked = st.selectbox("Pick a product to see associated items:", options=all_items)
 
-        def recommendations_for(item, rules):
-            agg = {}
-            for r in rules:
-                if item in r['antecedent']:
-                    for c in r['consequent']:
-                        best = agg.get(c)
-                        score = r['confidence']
-                        if best is None or score > best['confidence']:
-                            agg[c] = {
-                                'confidence': score,
-                                'support': r['support'],
-                                'lift': r['lift']
-                            }
-            out = [
-                {
-                    'item': k,
-                    'confidence_pct': v['confidence'] * 100,
-                    'support_pct': v['support'] * 100,
-                    'lift': v['lift']
-                }
-                for k, v in agg.items()
-            ]
-            out.sort(key=lambda x: (x['confidence_pct'], x['lift']), reverse=True)
-            return out
-
         if picked:
-            ap_recs = recommendations_for(picked, res['apriori']['rules'])
-            ec_recs = recommendations_for(picked, res['eclat']['rules'])
-            tab1, tab2 = st.tabs(["Apriori", "Eclat"])
+            ap_recs = res['apriori']['index'].for_item(picked)
+            ec_recs = res['eclat']['index'].for_item(picked)
+            fp_recs = res['fpgrowth']['index'].for_item(picked)
+            tab1, tab2, tab3 = st.tabs(["Apriori", "Eclat", "FP-Growth"])
             with tab1:
                 if ap_recs:
                     df = pd.DataFrame(ap_recs)
@@ -330,3 +497,24 @@ def run_app():
                     )
                 else:
                     st.info("No associations found for this item at current thresholds.")
+            with tab3:
+                if fp_recs:
+                    df = pd.DataFrame(fp_recs)
+                    df['strength'] = pd.cut(
+                        df['confidence_pct'],
+                        bins=[0, 40, 70, 100],
+                        labels=["Weak", "Moderate", "Strong"],
+                        include_lowest=True
+                    )
+                    st.dataframe(df, use_container_width=True, hide_index=True)
+                    st.write(
+                        f"**Recommendation:** Consider bundling **{picked}** "
+                        f"with the top items above."
+                    )
+                else:
+                    st.info("No associations found for this item at current thresholds.")
+
+    # poll until the background mining finishes (or is cancelled)
+    if st.session_state.get('jobs'):
+        time.sleep(0.5)
+        st.rerun()